@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Build study guides for many documents from their manifests.
+
+Each argument is a document manifest or a library manifest listing several
+(see documents.py). Documents are built concurrently on one shared pool of
+--jobs worker processes; every document runs clean-source-text.py (with
+--clean) and then build-html.py, exactly as if each script were run with
+--document FILE. Extracted text, markdown fragments and rendered page images
+are cached by content, so documents share those caches.
+
+A failing document does not stop the batch: its error and log are reported,
+the other documents carry on, and the exit status is 1. Build output goes to
+.cache/build/<name>/build.log under each document's root, next to its build
+manifest, so logs are never deployed with the output.
+
+Usage: python batch-build.py MANIFEST... [--jobs N] [--clean] [--incremental]
+                             [--embed eager|lazy|images|inline] [--backend NAME]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import build_scripts
+import documents
+import pdf_text
+
+def build_document(job):
+    """Clean and build one document; never raises.
+
+    Returns (name, ok, seconds, log, error).
+    """
+    manifest, clean, build_args = job
+    t0 = time.perf_counter()
+    log = io.StringIO()
+    name = Path(manifest).stem
+    doc = None
+    try:
+        doc = documents.load(manifest)
+        name = doc["name"]
+        with contextlib.redirect_stdout(log):
+            if clean:
+                build_scripts.load_script("clean-source-text").main(
+                    ["--document", str(manifest), "--backend", build_args["backend"]])
+            argv = ["--document", str(manifest), "--backend", build_args["backend"],
+                    "--embed", build_args["embed"]]
+            if build_args["incremental"]:
+                argv.append("--incremental")
+            build_scripts.load_script("build-html").main(argv)
+        error = None
+    except (Exception, SystemExit) as e:
+        # One bad document must not end the batch
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        log.write(traceback.format_exc())
+    if doc is not None:
+        log_dir = doc["root"] / ".cache" / "build" / doc["name"]
+        log_dir.mkdir(parents=True, exist_ok=True)
+        (log_dir / "build.log").write_text(log.getvalue())
+    return name, error is None, time.perf_counter() - t0, log.getvalue(), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifests", nargs="+", type=Path,
+                        help="document or library manifests")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="build N documents at a time")
+    parser.add_argument("--clean", action="store_true",
+                        help="regenerate each document's cleaned source sections first")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild artifacts whose inputs changed")
+    parser.add_argument("--embed", choices=["eager", "lazy", "images", "inline"],
+                        default="eager")
+    parser.add_argument("--backend", choices=sorted(pdf_text.BACKENDS),
+                        default=pdf_text.DEFAULT_BACKEND)
+    args = parser.parse_args()
+
+    manifests = []
+    for path in args.manifests:
+        try:
+            manifests.extend(documents.manifest_paths(path))
+        except documents.ManifestError as e:
+            parser.error(str(e))
+
+    build_args = {"backend": args.backend, "embed": args.embed,
+                  "incremental": args.incremental}
+    jobs = [(str(m), args.clean, build_args) for m in manifests]
+    print(f"Building {len(jobs)} document{'s' if len(jobs) != 1 else ''} "
+          f"on {max(1, args.jobs)} worker{'s' if args.jobs > 1 else ''}...")
+
+    t0 = time.perf_counter()
+    results = []
+    if args.jobs <= 1:
+        completed = map(build_document, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=args.jobs)
+        futures = {pool.submit(build_document, job): job for job in jobs}
+
+        def collect():
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:  # a worker died (e.g. out of memory)
+                    manifest = futures[future][0]
+                    yield Path(manifest).stem, False, 0.0, "", f"worker failed: {e!r}"
+
+        completed = collect()
+
+    for name, ok, seconds, log, error in completed:
+        results.append(ok)
+        print(f"  {'ok  ' if ok else 'FAIL'} {name} ({seconds:.1f}s)")
+        if not ok:
+            print("    " + error)
+            print("".join(f"    | {line}\n" for line in log.splitlines()[-20:]), end="")
+    if args.jobs > 1:
+        pool.shutdown()
+
+    elapsed = time.perf_counter() - t0
+    built = sum(results)
+    rate = built / elapsed * 60 if elapsed else 0.0
+    print(f"\n{built}/{len(results)} documents built in {elapsed:.1f}s "
+          f"({rate:.1f} documents/minute)")
+    if built < len(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Check and benchmark the paragraph/block-quote assembler in clean-source-text.py.
+
+--check is self-contained: it compares the assembler with a reference copy
+of the original one (index-based, joining lines with join_with_hyphens) on
+randomized content item sequences, and on synthetic documents written by the
+real section writer both section by section and with --stream. --verify
+regenerates the source sections from the PDF and compares them with the
+markdown files already in source-sections/; it needs the poppler build that
+produced them.
+
+Without --verify, times clean_and_split_sections + process_section on
+synthetic layout text of increasing size (long paragraphs, multi-page block
+quotes, hyphenated breaks, page headers) and reports the cost per line. A
+linear assembler keeps that figure flat as the input grows.
+
+Usage: python bench-assemble.py [--check [--cases N]] [--verify] [--backend NAME]
+                                 [--sizes 1250,2500,5000,10000]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import build_scripts
+import pdf_text
+
+WORDS = ("the of and to in that political modern nature question liberal "
+         "philosopher violence history enlightenment").split()
+
+
+def synthetic_layout(num_lines, seed=0):
+    """Generate pdftotext -layout style text with num_lines lines.
+
+    Mixes normal paragraphs, one very long paragraph and one very long block
+    quote (the inputs that made the old assembler quadratic), page
+    headers/footers with blank page-break gaps, dividers and hyphenated
+    line breaks.
+    """
+    rng = random.Random(seed)
+    lines = ["    he twenty-first century started with a bang."]
+
+    def emit(indent=0, hyphen=False):
+        text = " ".join(rng.choice(WORDS) for _ in range(10))
+        lines.append(" " * indent + text + (" infe-" if hyphen else ""))
+        if hyphen:
+            lines.append(" " * indent + "rior " + text)
+        if len(lines) % 45 < 2:
+            # Page break: footer, header and the blank gaps around them
+            lines.extend(["", f"The Straussian Moment {190 + len(lines) // 45}", ""])
+
+    # One long paragraph and one long block quote, each a large share of the input
+    emit(indent=5)
+    for k in range(num_lines // 8):
+        emit(hyphen=k % 7 == 0)
+    emit(indent=5)
+    for k in range(num_lines // 8):
+        emit(indent=8, hyphen=k % 9 == 0)
+
+    # Ordinary paragraphs and dividers for the rest
+    while len(lines) < num_lines:
+        roll = rng.random()
+        if roll < 0.02:
+            lines.extend(["", "                         *  *  *", ""])
+        emit(indent=5 if roll < 0.15 else 0, hyphen=roll > 0.9)
+    return "\n".join(lines[:num_lines]) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Reference assembler: the original implementation, kept to check against
+# ---------------------------------------------------------------------------
+
+def join_with_hyphens(text_a, text_b):
+    """Join two text fragments, handling hyphenated word breaks."""
+    if not text_a:
+        return text_b
+    if not text_b:
+        return text_a
+    if (text_a[-1] == '-' and len(text_a) >= 2 and text_a[-2].isalpha()
+            and not text_a.endswith('--') and text_b[0].islower()):
+        return text_a[:-1] + text_b
+    return text_a + ' ' + text_b
+
+
+def reference_join(parts):
+    result = parts[0] if parts else ''
+    for part in parts[1:]:
+        result = join_with_hyphens(result, part)
+    return result
+
+
+def next_content(items, i):
+    """Index of the first non-blank item at or after i."""
+    while i < len(items) and items[i] == 'BLANK':
+        i += 1
+    return i
+
+
+def reference_is_quote(items, i, min_indent):
+    """True if the first non-blank item after i is an indented text line."""
+    j = next_content(items, i + 1)
+    return (j < len(items) and not isinstance(items[j][0], str)
+            and items[j][0] >= min_indent)
+
+
+def reference_quote(items, i, min_indent):
+    parts = []
+    while i < len(items):
+        item = items[i]
+        if item == 'BLANK':
+            j = next_content(items, i + 1)
+            if j >= len(items) or isinstance(items[j][0], str):
+                break
+            if items[j][0] >= min_indent and reference_is_quote(items, j, min_indent):
+                i = j
+                continue
+            if parts and parts[-1].endswith('-') and not parts[-1].endswith('--'):
+                i = j
+                continue
+            break
+        if isinstance(item[0], str):
+            break
+        indent, text = item
+        if indent >= min_indent:
+            parts.append(text)
+        elif (parts and parts[-1].endswith('-') and not parts[-1].endswith('--')
+                and text and text[0].islower()):
+            parts.append(text)
+        else:
+            break
+        i += 1
+    return reference_join(parts), i
+
+
+def reference_paragraph(items, i, min_indent):
+    parts = [items[i][1]]
+    i += 1
+    while i < len(items):
+        item = items[i]
+        if item == 'BLANK':
+            j = next_content(items, i + 1)
+            if j >= len(items) or isinstance(items[j][0], str) or items[j][0] >= min_indent:
+                break
+            i = j
+            continue
+        if isinstance(item[0], str) or item[0] >= min_indent:
+            break
+        parts.append(item[1])
+        i += 1
+    return reference_join(parts), i
+
+
+def reference_section(items, min_indent):
+    """Markdown for a list of content items, as the original assembler made it."""
+    parts = []
+    i = 0
+    while i < len(items):
+        item = items[i]
+        if item == 'BLANK':
+            i += 1
+        elif item[0] == 'DIVIDER':
+            parts.append('\u2042')
+            i += 1
+        elif item[0] == 'SUBHEADING':
+            parts.append(item[1])
+            i += 1
+        elif item[0] >= min_indent and reference_is_quote(items, i, min_indent):
+            text, i = reference_quote(items, i, min_indent)
+            parts.append(f'> {text}')
+        else:
+            text, i = reference_paragraph(items, i, min_indent)
+            parts.append(text)
+    return '\n\n'.join(parts)
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+# Line texts that exercise the hyphenation and continuation rules
+CHECK_TEXTS = ["word word infe-", "rior things and", "lowercase start", "Upper start",
+               "ending--", "a-", "b", "-", "x", "Word-", "1-", "z--", "mid-dle", "low"]
+
+
+def random_items(rng, length, min_indent):
+    """A random content item sequence, shaped like iter_clean_items output.
+
+    BLANK runs are collapsed and never lead or trail, as in real input.
+    """
+    items = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.2:
+            if items and items[-1] != 'BLANK':
+                items.append('BLANK')
+        elif roll < 0.25:
+            items.append(('DIVIDER', '*  *  *'))
+        elif roll < 0.3:
+            items.append(('SUBHEADING', 'THE QUESTION OF HUMAN NATURE'))
+        else:
+            indent = rng.choice([0, 0, 2, min_indent - 1, min_indent, 5, 8, 12])
+            items.append((indent, rng.choice(CHECK_TEXTS)))
+    while items and items[-1] == 'BLANK':
+        items.pop()
+    return items
+
+
+def synthetic_document(clean, seed):
+    """Layout text for the configured document: epigraph, then every section.
+
+    Each section body is synthetic_layout() text; sections after the first
+    start with their heading, and the document's end marker closes the text.
+    """
+    cleaner = clean.DOCUMENT["cleaner"]
+    lines = [" " * 20 + line for line in cleaner["title_page"]]
+    lines += ["", " " * 12 + "Verse line one of the epigraph,",
+              " " * 12 + "and a second line of verse", ""]
+    if cleaner["epigraph_end"]:
+        lines += [" " * 20 + cleaner["epigraph_end"], ""]
+    for k, sec in enumerate(clean.SECTIONS):
+        if k:
+            lines += ["", " " * 10 + sec["start_marker"], ""]
+        lines += synthetic_layout(300 + 40 * k, seed=seed * 100 + k).splitlines()
+    lines += ["", clean.DOCUMENT["end_marker"], "", "1. A note."]
+    return "\n".join(lines) + "\n"
+
+
+def expected_files(clean, layout_text):
+    """{filename: text} the original cleaner wrote for layout_text."""
+    section_ranges, lines, poem_lines = clean.clean_and_split_sections(layout_text)
+    files = {}
+    for sec in clean.SECTIONS:
+        start, end = section_ranges[sec["num"]]
+        text = reference_section(clean.extract_clean_lines(lines, start, end),
+                                 clean.MIN_INDENT)
+        if sec is clean.SECTIONS[0]:
+            text = clean.clean_poem(poem_lines) + "\n\n" + text
+        files[sec["filename"]] = f"# Section {sec['num']}: {sec['title']}\n\n" + text + "\n"
+    return files
+
+
+def written_files(clean, layout_text, stream):
+    """{filename: text} written by clean_section (or clean_stream) for layout_text."""
+    doc = clean.DOCUMENT
+    with tempfile.TemporaryDirectory() as tmp:
+        clean.configure({**doc, "sources": Path(tmp)})
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                if stream:
+                    clean.clean_stream(layout_text.splitlines())
+                else:
+                    section_ranges, lines, poem_lines = clean.clean_and_split_sections(layout_text)
+                    for sec in clean.SECTIONS:
+                        start, end = section_ranges[sec["num"]]
+                        poem = poem_lines if sec is clean.SECTIONS[0] else None
+                        clean.clean_section((sec, lines[start:end], poem))
+        finally:
+            clean.configure(doc)
+        return {path.name: path.read_text() for path in Path(tmp).iterdir()}
+
+
+def check(clean, cases, seed=0):
+    """Compare the assembler and section writer with the reference; True if equal."""
+    rng = random.Random(seed)
+    mismatches = 0
+    for case in range(cases):
+        items = random_items(rng, rng.randint(1, 60), clean.MIN_INDENT)
+        expected = reference_section(items, clean.MIN_INDENT)
+        actual = "\n\n".join(clean.format_element(e) for e in clean.assemble(iter(items)))
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  item case {case} differs: {items!r}")
+    print(f"  {cases} random item sequences: {mismatches} mismatches")
+
+    documents = max(1, cases // 500)
+    doc_mismatches = 0
+    for doc_seed in range(documents):
+        layout_text = synthetic_document(clean, seed + doc_seed)
+        expected = expected_files(clean, layout_text)
+        for mode, stream in (("sections", False), ("--stream", True)):
+            written = written_files(clean, layout_text, stream)
+            for name in sorted(expected):
+                if written.get(name) != expected[name]:
+                    doc_mismatches += 1
+                    print(f"  document {doc_seed} ({mode}): {name} differs")
+    print(f"  {documents} synthetic documents, section-by-section and streamed: "
+          f"{doc_mismatches} mismatches")
+    return mismatches + doc_mismatches == 0
+
+
+def verify(clean, backend):
+    """Regenerate every section and compare with the files on disk."""
+    layout_text = clean.get_layout_text(backend=backend)
+    section_ranges, lines, poem_lines = clean.clean_and_split_sections(layout_text)
+    mismatches = 0
+    for sec in clean.SECTIONS:
+        start, end = section_ranges[sec["num"]]
+        text = clean.process_section(lines, start, end)
+        if sec["num"] == 1:
+            text = clean.clean_poem(poem_lines) + "\n\n" + text
+        expected_path = clean.SOURCES / sec["filename"]
+        expected = expected_path.read_text()
+        actual = f"# Section {sec['num']}: {sec['title']}\n\n" + text + "\n"
+        same = actual == expected
+        mismatches += not same
+        print(f"  Section {sec['num']}: {'identical' if same else 'DIFFERS'} ({expected_path.name})")
+    return mismatches == 0
+
+
+def benchmark(clean, sizes):
+    print(f"{'lines':>8}{'seconds':>10}{'us/line':>10}")
+    for size in sizes:
+        text = synthetic_layout(size)
+        t0 = time.perf_counter()
+        section_ranges, lines, _ = clean.clean_and_split_sections(text)
+        clean.process_section(lines, 0, len(lines))
+        elapsed = time.perf_counter() - t0
+        print(f"{size:>8}{elapsed:>10.3f}{elapsed / size * 1e6:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true",
+                        help="compare with the reference assembler on generated input")
+    parser.add_argument("--cases", type=int, default=3000,
+                        help="random item sequences for --check")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare regenerated sections with source-sections/")
+    parser.add_argument("--backend", choices=sorted(pdf_text.BACKENDS),
+                        default=pdf_text.DEFAULT_BACKEND)
+    parser.add_argument("--sizes", default="1250,2500,5000,10000",
+                        help="comma-separated synthetic input sizes in lines")
+    args = parser.parse_args()
+
+    clean = build_scripts.load_script("clean-source-text")
+    if args.check:
+        sys.exit(0 if check(clean, args.cases) else 1)
+    if args.verify:
+        sys.exit(0 if verify(clean, args.backend) else 1)
+    benchmark(clean, [int(s) for s in args.sizes.split(",")])
+
+
+if __name__ == "__main__":
+    main()
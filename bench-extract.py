@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark PDF text extraction backends for speed and fidelity.
+
+For every backend in pdf_text.BACKENDS this extracts the whole PDF in raw and
+layout mode (bypassing the cache) and reports pages/sec. Fidelity is measured
+against the reference backend (pdftotext when available): whether the section
+markers land on the same pages, and how similar the per-page text is once
+whitespace is normalized.
+
+Usage: python bench-extract.py [--pdf FILE] [--repeat N]
+"""
+
+import argparse
+import difflib
+import re
+import time
+from pathlib import Path
+
+import build_scripts
+import pdf_text
+
+HERE = Path(__file__).resolve().parent
+
+
+def time_backend(backend, pdf, layout, repeat):
+    """Return (best seconds, pages) for a full-document extraction."""
+    best = None
+    pages = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pages = pdf_text.BACKENDS[backend](pdf, layout=layout)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pages
+
+
+def similarity(pages_a, pages_b):
+    """Mean per-page similarity (0-1) after collapsing whitespace."""
+    if not pages_a or len(pages_a) != len(pages_b):
+        return 0.0
+    ratios = []
+    for a, b in zip(pages_a, pages_b):
+        a = re.sub(r"\s+", " ", a).strip()
+        b = re.sub(r"\s+", " ", b).strip()
+        ratios.append(difflib.SequenceMatcher(None, a, b, autojunk=False).ratio())
+    return sum(ratios) / len(ratios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", type=Path, default=HERE / "2007-thiel.pdf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    build_html = build_scripts.load_script("build-html")
+
+    results = {}
+    for backend in pdf_text.BACKENDS:
+        try:
+            raw_time, raw_pages = time_backend(backend, args.pdf, False, args.repeat)
+            layout_time, layout_pages = time_backend(backend, args.pdf, True, args.repeat)
+        except FileNotFoundError as e:
+            print(f"  {backend}: unavailable ({e.filename} not found)")
+            continue
+        results[backend] = {
+            "raw_time": raw_time,
+            "layout_time": layout_time,
+            "raw": raw_pages,
+            "layout": layout_pages,
+            "markers": build_html.scan_section_pages(raw_pages),
+        }
+
+    if not results:
+        print("No extraction backend is available.")
+        return
+
+    reference = pdf_text.DEFAULT_BACKEND if pdf_text.DEFAULT_BACKEND in results else next(iter(results))
+    ref = results[reference]
+    print(f"\nReference backend: {reference} ({len(ref['raw'])} pages)\n")
+    print(f"{'backend':<12}{'raw p/s':>10}{'layout p/s':>12}{'markers':>10}{'raw sim':>10}{'layout sim':>12}")
+    for backend, r in results.items():
+        raw_rate = len(r["raw"]) / r["raw_time"] if r["raw_time"] else 0
+        layout_rate = len(r["layout"]) / r["layout_time"] if r["layout_time"] else 0
+        matched = sum(1 for k, page in ref["markers"].items() if r["markers"].get(k) == page)
+        markers = f"{matched}/{len(ref['markers'])}"
+        print(f"{backend:<12}{raw_rate:>10.1f}{layout_rate:>12.1f}{markers:>10}"
+              f"{similarity(r['raw'], ref['raw']):>10.3f}"
+              f"{similarity(r['layout'], ref['layout']):>12.3f}")
+
+    for backend, r in results.items():
+        if r["markers"] != ref["markers"]:
+            print(f"\n{backend} marker pages differ from {reference}:")
+            for key in ref["markers"]:
+                print(f"  {key}: {r['markers'].get(key)} (reference {ref['markers'][key]})")
+
+
+if __name__ == "__main__":
+    main()
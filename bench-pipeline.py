@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Benchmark both build scripts on synthetic documents of increasing size.
+
+For each size (in pages) this generates, offline, a synthetic PDF and the
+matching pdftotext -layout text: section headings, a drop-cap opening line,
+block quotes, dividers, running headers/footers and page numbers (the lines
+ARTIFACT_RE drops) and hyphenated line breaks. It then times every stage of
+build-html.py (find_section_pages, compute_page_ranges, split_pdf,
+build_html) and clean-source-text.py (get_layout_text,
+clean_and_split_sections, process_section) with build_metrics, in a fresh
+process per size so peak RSS is not inherited from a smaller run. Each size
+is run --repeat times and every stage keeps its best time and lowest peak
+memory, so a single noisy sample is not mistaken for a regression.
+
+Results can be saved with --save and compared with --baseline: a stage is
+flagged when its pages/sec drops, or the process's peak memory grows, by
+more than --tolerance against the baseline. The exit status is 1 if
+anything was flagged.
+
+Usage: python bench-pipeline.py [--sizes 10,100,1000,5000] [--backend NAME] [--repeat 5]
+                                [--save FILE] [--baseline FILE] [--tolerance 0.25]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pikepdf
+
+import build_metrics
+import build_scripts
+import documents
+import md_render
+import pdf_text
+
+WORDS = ("the of and to in that political modern nature question liberal "
+         "philosopher violence history enlightenment").split()
+
+LINES_PER_PAGE = 40
+FONT_SIZE = 10
+CHAR_WIDTH = 0.6 * FONT_SIZE  # Courier advance, in points
+PAGE_SIZE = (612, 792)
+
+# Stages that finish faster than this are too noisy to flag
+MIN_FLAGGED_SECONDS = 0.05
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def synthetic_pages(num_pages, markers, seed=0, quote_rate=0.08, divider_rate=0.01,
+                    hyphen_rate=0.05, drop_cap=True, artifacts=True):
+    """Generate pdftotext -layout style text as a list of pages of lines.
+
+    markers: main section headings, placed at evenly spaced pages after the
+    first (section 1 starts on page 1 with the body anchor line). The essay
+    ends with a NOTES heading on the last page.
+    """
+    rng = random.Random(seed)
+    heading_pages = {1 + (k + 1) * (num_pages - 1) // (len(markers) + 1): marker
+                     for k, marker in enumerate(markers)}
+
+    def sentence(n=10):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    pages = []
+    quote_left = 0
+    for page_num in range(1, num_pages + 1):
+        lines = []
+        if artifacts and page_num > 1:
+            # Running header (none on the opening page), as pdftotext -layout lays it out
+            lines += ["", f"{' ' * 30}The Straussian Moment {188 + 2 * page_num}"
+                      if page_num % 2 else f"{187 + 2 * page_num} Peter Thiel", ""]
+        if page_num == 1:
+            first = "he twenty-first" if drop_cap else "The twenty-first"
+            lines.append(f"{' ' * 8}{first} century started with a bang. {sentence(4)}")
+        if page_num in heading_pages:
+            lines += ["", " " * 18 + heading_pages[page_num], ""]
+            lines.append(" " * 8 + ("he " if drop_cap else "The ") + sentence(9))
+        while len(lines) < LINES_PER_PAGE:
+            roll = rng.random()
+            if quote_left:
+                quote_left -= 1
+                indent = 8
+            elif roll < quote_rate:
+                quote_left = rng.randint(3, 12)
+                lines.append("")
+                indent = 8
+            elif roll < quote_rate + divider_rate:
+                lines += ["", " " * 25 + "*  *  *", ""]
+                continue
+            else:
+                indent = 5 if roll > 0.85 else 0
+            text = sentence()
+            if rng.random() < hyphen_rate:
+                lines.append(" " * indent + text + " infe-")
+                text = "rior " + sentence(8)
+            lines.append(" " * indent + text)
+        if page_num == num_pages:
+            lines += ["", " " * 30 + "NOTES", "", "1. " + sentence()]
+        if artifacts:
+            lines += ["", f"{' ' * 35}{100 + page_num % 900}"]
+        pages.append(lines)
+    return pages
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(pages, out_path):
+    """Lay the page lines out in Courier, one text line per layout line."""
+    pdf = pikepdf.Pdf.new()
+    font = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.Font, Subtype=pikepdf.Name.Type1, BaseFont=pikepdf.Name.Courier,
+        FirstChar=32, LastChar=126, Widths=pikepdf.Array([600] * 95),
+        Encoding=pikepdf.Name.WinAnsiEncoding))
+    width, height = PAGE_SIZE
+    leading = (height - 72) / (LINES_PER_PAGE + 10)
+    for lines in pages:
+        ops = ["BT", f"/F1 {FONT_SIZE} Tf"]
+        for i, line in enumerate(lines):
+            text = line.lstrip()
+            if not text:
+                continue
+            x = 36 + (len(line) - len(text)) * CHAR_WIDTH
+            y = height - 36 - i * leading
+            ops.append(f"1 0 0 1 {x:.2f} {y:.2f} Tm ({_pdf_string(text)}) Tj")
+        ops.append("ET")
+        page = pdf.add_blank_page(page_size=PAGE_SIZE)
+        page.Resources = pikepdf.Dictionary(Font=pikepdf.Dictionary(F1=font))
+        page.Contents = pdf.make_stream("\n".join(ops).encode("latin-1"))
+    pdf.save(out_path)
+
+
+# ---------------------------------------------------------------------------
+# One run (in its own process)
+# ---------------------------------------------------------------------------
+
+def synthetic_manifest(workdir):
+    """Write a document manifest for the synthetic corpus in workdir.
+
+    It is the default document with its PDF, cleaned sources and output in
+    workdir; the guide's analysis text still comes from this checkout.
+    """
+    data = json.loads(documents.DEFAULT_MANIFEST.read_text())
+    data.update(
+        root=str(workdir),
+        pdf="synthetic.pdf",
+        analyses=str(documents.load(documents.DEFAULT_MANIFEST)["analyses"]),
+        sources="source-sections",
+        output="output",
+    )
+    path = workdir / "document.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def run_one(num_pages, backend, workdir):
+    """Generate a corpus of num_pages and time every stage of both scripts."""
+    workdir = Path(workdir)
+    doc = documents.load(synthetic_manifest(workdir))
+    build = build_scripts.load_script("build-html")
+    clean = build_scripts.load_script("clean-source-text")
+    build.configure(doc)
+    clean.configure(doc)
+
+    markers = [sec["start_marker"] for sec in clean.SECTIONS if sec["start_marker"]]
+    pages = synthetic_pages(num_pages, markers)
+    write_synthetic_pdf(pages, doc["pdf"])
+    layout_text = "".join("\n".join(lines) + "\n\f" for lines in pages)
+
+    # Cold caches, so no run benefits from an earlier one (the build
+    # manifest and fragments already live under workdir/.cache)
+    pdf_text.CACHE_DIR = workdir / "cache" / "pdf-text"
+    md_render.CACHE_DIR = workdir / "cache" / "md-html"
+    doc["sources"].mkdir()
+
+    metrics = build_metrics.Metrics("bench-pipeline.py")
+    with metrics.stage("find_section_pages"):
+        marker_pages, total = build.find_section_pages(backend=backend)
+    with metrics.stage("compute_page_ranges"):
+        page_ranges = build.compute_page_ranges(marker_pages, total)
+    with metrics.stage("split_pdf"):
+        build.split_pdf(page_ranges)
+    with metrics.stage("build_html"):
+        build.build_html(page_ranges)
+
+    with metrics.stage("get_layout_text"):
+        clean.get_layout_text(backend=backend)
+    # The cleaner runs on the generated layout text, which is exactly what
+    # pdftotext -layout would produce for the synthetic PDF
+    with metrics.stage("clean_and_split_sections"):
+        section_ranges, lines, poem_lines = clean.clean_and_split_sections(layout_text)
+    with metrics.stage("process_section"):
+        for sec in clean.SECTIONS:
+            start, end = section_ranges[sec["num"]]
+            clean.clean_section((sec, lines[start:end], poem_lines if sec is clean.SECTIONS[0] else None))
+
+    return {"pages": num_pages, "lines": len(lines), "stages": metrics.report()["stages"]}
+
+
+def measure(num_pages, backend):
+    """Run one size in a fresh interpreter and return its results."""
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as workdir:
+        out = subprocess.run(
+            [sys.executable, __file__, "--run-one", str(num_pages),
+             "--backend", backend, "--workdir", workdir],
+            check=True, stdout=subprocess.PIPE, text=True,
+        ).stdout
+    return json.loads(out)
+
+
+def best_of(runs):
+    """Combine repeated runs of one size: each stage's best wall time and
+    lowest peak memory.
+    """
+    best = dict(runs[0], stages=[])
+    for stage in runs[0]["stages"]:
+        samples = [s for run in runs for s in run["stages"] if s["stage"] == stage["stage"]]
+        entry = dict(min(samples, key=lambda s: s["wall_s"]))
+        entry["peak_rss_bytes"] = min(s["peak_rss_bytes"] for s in samples)
+        best["stages"].append(entry)
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def report(results):
+    print(f"{'pages':>6}  {'stage':<26}{'seconds':>9}{'pages/s':>11}{'peak MB':>9}")
+    for run in results:
+        for stage in run["stages"]:
+            rate = run["pages"] / stage["wall_s"] if stage["wall_s"] else float("inf")
+            print(f"{run['pages']:>6}  {stage['stage']:<26}{stage['wall_s']:>9.3f}"
+                  f"{rate:>11.1f}{stage['peak_rss_bytes'] / (1 << 20):>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Print and count stages that regressed against the baseline results."""
+    previous = {(run["pages"], s["stage"]): s for run in baseline["results"]
+                for s in run["stages"]}
+    flagged = 0
+    for run in results:
+        for stage in run["stages"]:
+            old = previous.get((run["pages"], stage["stage"]))
+            if old is None:
+                continue
+            problems = []
+            if (stage["wall_s"] >= MIN_FLAGGED_SECONDS
+                    and stage["wall_s"] > old["wall_s"] * (1 + tolerance)):
+                problems.append(f"{old['wall_s']:.3f}s -> {stage['wall_s']:.3f}s")
+            if stage["peak_rss_bytes"] > old["peak_rss_bytes"] * (1 + tolerance):
+                problems.append(f"peak {old['peak_rss_bytes'] / (1 << 20):.1f} -> "
+                                f"{stage['peak_rss_bytes'] / (1 << 20):.1f} MB")
+            if problems:
+                flagged += 1
+                print(f"  REGRESSION {run['pages']} pages, {stage['stage']}: "
+                      + "; ".join(problems))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,5000",
+                        help="comma-separated document sizes in pages")
+    parser.add_argument("--backend", choices=sorted(pdf_text.BACKENDS),
+                        default=pdf_text.DEFAULT_BACKEND)
+    parser.add_argument("--save", type=Path, help="write the results as JSON to FILE")
+    parser.add_argument("--baseline", type=Path,
+                        help="flag regressions against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="run each size N times and keep the best of each stage")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        # The scripts' progress output would get mixed into the JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_one(args.run_one, args.backend, args.workdir)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"Benchmarking {size} pages...", flush=True)
+        results.append(best_of([measure(size, args.backend)
+                                for _ in range(max(1, args.repeat))]))
+    print()
+    report(results)
+
+    if args.save:
+        args.save.write_text(json.dumps({"backend": args.backend, "results": results},
+                                        indent=1) + "\n")
+        print(f"\nResults written to {args.save}")
+    if args.baseline:
+        print(f"\nComparing with {args.baseline} (tolerance {args.tolerance:.0%})...")
+        flagged = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        print(f"  {flagged} regression{'s' if flagged != 1 else ''}")
+        if flagged:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,110 +5,167 @@ Instead of extracting and reformatting the source text (which introduces
 artifacts), this embeds the original PDF pages directly using the browser's
 native PDF viewer. Backgrounders go before, summaries go after.
 
-Usage: python build-html.py
+--embed inline instead renders the cleaned source-sections/ markdown written
+by clean-source-text.py as HTML, linking the section PDF as a fallback.
+
+--pdf-output single writes one linearized output/source.pdf in place of the
+per-section files; sections then point into it with #page=N fragments.
+
+--watch keeps running after the build: it serves the output directory on
+http://127.0.0.1:8000/ (--port) and rebuilds only what changed whenever an
+analysis file, the PDF or the build code changes, reloading open pages.
+
+Usage: python build-html.py [--document FILE] [--backend pdftotext|pikepdf] [--workers N]
+                            [--incremental] [--jobs N] [--embed eager|lazy|images|inline]
+                            [--pdf-output split|single] [--optimize [--image-dpi N]]
+                            [--hash-assets] [--production] [--watch [--port N]]
+                            [--profile] [--metrics-json FILE]
+The document (PDF, section markers, analysis files, output directory) comes
+from a manifest, documents/straussian-moment.json by default; see
+documents.py and batch-build.py for building many documents.
+
 Output: output/study-guide.html + output/sections/section-N.pdf
+        (output/source.pdf instead with --pdf-output single)
+        (+ output/pages/<page hash>-<width>.png with --embed images)
+        (+ output/assets/guide.<hash>.css and .gz/.br copies with --production)
+With --hash-assets the site is built in .cache/build/<name>/site and published
+to output/ as section-N.<hash>.pdf etc. plus output/asset-manifest.json.
 """
 
+import argparse
+import hashlib
+import io
+import os
 import subprocess
-import re
+import sys
+import time
+import zlib
 from pathlib import Path
 
-import markdown
 import pikepdf
 
-ROOT = Path("/Users/kostasstankevicius/The-Straussian-Moment-Analysis")
-ANALYSES = ROOT / "analyses" / "straussian-moment"
-PDF = ROOT / "2007-thiel.pdf"
-OUTPUT = ROOT / "output"
-SECTIONS_DIR = OUTPUT / "sections"
-
-# Section markers (same as clean-source-text.py)
-SECTIONS = [
-    {
-        "num": 1,
-        "title": "Introduction / The Question of Human Nature",
-        "start_marker": None,
-        "end_marker": "JOHN Locke: THE AMERICAN COMPROMISE",
-        "analysis": ANALYSES / "pass-1-comprehension.md",
-        "analysis_type": "main",
-    },
-    {
-        "num": 2,
-        "title": "John Locke: The American Compromise",
-        "start_marker": "JOHN Locke: THE AMERICAN COMPROMISE",
-        "end_marker": "CARL SCHMITT: THE PERSISTENCE OF THE POLITICAL",
-        "analysis": ANALYSES / "section-2-comprehension.md",
-        "analysis_type": "standalone",
-    },
-    {
-        "num": 3,
-        "title": "Carl Schmitt: The Persistence of the Political",
-        "start_marker": "CARL SCHMITT: THE PERSISTENCE OF THE POLITICAL",
-        "end_marker": "LEO STRAUSS: PROCEED WITH CAUTION",
-        "analysis": ANALYSES / "section-3-comprehension.md",
-        "analysis_type": "standalone",
-    },
-    {
-        "num": 4,
-        "title": "Leo Strauss: Proceed with Caution",
-        "start_marker": "LEO STRAUSS: PROCEED WITH CAUTION",
-        "end_marker": "RENE GIRARD: THE END OF THE CITY OF MAN",
-        "analysis": ANALYSES / "section-4-comprehension.md",
-        "analysis_type": "standalone",
-    },
-    {
-        "num": 5,
-        "title": "Rene Girard: The End of the City of Man",
-        "start_marker": "RENE GIRARD: THE END OF THE CITY OF MAN",
-        "end_marker": "NOTES",
-        "analysis": ANALYSES / "section-5-comprehension.md",
-        "analysis_type": "standalone",
-    },
-]
+import build_graph
+import build_metrics
+import documents
+import md_outline
+import md_render
+import pdf_text
+import preview_server
+import section_markers
+import web_assets
+
+# Module-level paths and SECTIONS describe the document being built; they
+# come from a document manifest (see documents.py) and are set by configure()
+DOCUMENT = ROOT = ANALYSES = SOURCES = PDF = OUTPUT = PUBLISH_DIR = HASH_ASSETS = None
+SECTIONS_DIR = SINGLE_PDF = PAGES_DIR = GUIDE = ASSETS_DIR = MANIFEST = FRAGMENTS_DIR = None
+SECTIONS = []
+
+
+def configure(doc, hash_assets=False):
+    """Point the module-level paths and SECTIONS at one loaded document.
+
+    hash_assets builds the site into the build cache instead of the
+    document's output directory; publish_assets() then copies it there.
+    """
+    global DOCUMENT, ROOT, ANALYSES, SOURCES, PDF, OUTPUT, PUBLISH_DIR, SECTIONS_DIR, SINGLE_PDF
+    global PAGES_DIR, GUIDE, ASSETS_DIR, MANIFEST, FRAGMENTS_DIR, SECTIONS, HASH_ASSETS
+    DOCUMENT = doc
+    HASH_ASSETS = hash_assets
+    ROOT = doc["root"]
+    ANALYSES = doc["analyses"]
+    SOURCES = doc["sources"]
+    PDF = doc["pdf"]
+    PUBLISH_DIR = doc["output"]
+    OUTPUT = (ROOT / ".cache" / "build" / doc["name"] / "site" if hash_assets
+              else PUBLISH_DIR)
+    SECTIONS_DIR = OUTPUT / "sections"
+    SINGLE_PDF = OUTPUT / "source.pdf"
+    PAGES_DIR = OUTPUT / "pages"
+    GUIDE = OUTPUT / "study-guide.html"
+    ASSETS_DIR = OUTPUT / "assets"
+    # Per-document build state, so documents sharing a root do not collide
+    MANIFEST = ROOT / ".cache" / "build" / doc["name"] / "manifest.json"
+    FRAGMENTS_DIR = ROOT / ".cache" / "build" / doc["name"] / "fragments"
+    SECTIONS = [
+        {key: sec[key] for key in ("num", "title", "start_marker",
+                                   "analysis", "analysis_type", "source")}
+        for sec in doc["sections"]
+    ]
+
+
+configure(documents.load(documents.DEFAULT_MANIFEST))
 
 
 # ---------------------------------------------------------------------------
 # Step 1: Determine page ranges per section
 # ---------------------------------------------------------------------------
 
-def get_page_text(page_num):
-    """Extract text from a single PDF page using pdftotext."""
-    result = subprocess.run(
-        ["pdftotext", "-f", str(page_num), "-l", str(page_num), str(PDF), "-"],
-        capture_output=True, text=True,
-    )
-    return result.stdout
-
-
 def get_total_pages():
     """Get total page count using pikepdf."""
     with pikepdf.open(PDF) as pdf:
         return len(pdf.pages)
 
 
-def find_section_pages():
-    """Find the start page for each section marker."""
-    total = get_total_pages()
-    marker_pages = {}
-
-    for page_num in range(1, total + 1):
-        text = get_page_text(page_num)
-
-        # Section 1: find the first page with body text
-        if "twenty-first century started" in text and 1 not in marker_pages:
-            marker_pages[1] = page_num
-
-        # Other sections: find their heading markers
-        for sec in SECTIONS:
-            if sec["start_marker"] and sec["start_marker"] in text:
-                if sec["num"] not in marker_pages:
-                    marker_pages[sec["num"]] = page_num
+def section_scanner():
+    """Build a single-pass scanner over every section boundary marker."""
+    end_marker = DOCUMENT["end_marker"]
+    markers = [
+        # First section: the first page with body text
+        (SECTIONS[0]["num"], DOCUMENT["body_marker"], False),
+        # NOTES heading on a line of its own (end of essay)
+        (end_marker, end_marker, True),
+    ]
+    # Other sections: their heading markers
+    markers += [(sec["num"], sec["start_marker"], False)
+                for sec in SECTIONS if sec["start_marker"]]
+    return section_markers.MarkerScanner(markers)
+
+
+def scan_section_pages(page_texts):
+    """Find the start page for each section marker in per-page text.
+
+    Stops reading pages as soon as every marker has been found. Section
+    headings with no exact match fall back to the most similar line in an
+    n-gram index of the pages, if it is at least
+    section_markers.MIN_MARKER_CONFIDENCE alike.
+    """
+    page_texts = list(page_texts)
+    first = section_scanner().first_matches(page_texts)
+    missing = [sec for sec in SECTIONS if sec["start_marker"] and sec["num"] not in first]
+    if missing:
+        index = section_markers.FuzzyMarkerIndex(page_texts)
+        for sec in missing:
+            match = index.best_match(sec["start_marker"])
+            if match and match.confidence >= section_markers.MIN_MARKER_CONFIDENCE:
+                first[sec["num"]] = match.chunk
+                print(f"  Section {sec['num']}: no exact heading, matched {match.text!r} "
+                      f"on page {match.chunk + 1} (confidence {match.confidence:.2f})")
+            else:
+                print(f"  Section {sec['num']}: heading {sec['start_marker']!r} not found")
+    return {key: index + 1 for key, index in first.items()}
+
+
+def find_section_pages(backend=pdf_text.DEFAULT_BACKEND, workers=1):
+    """Find the start page for each section marker.
+
+    Results are cached per PDF digest, backend, marker config and matcher
+    version, so an unchanged PDF is never re-extracted or re-scanned.
+    """
+    key = pdf_text.config_key([backend, DOCUMENT["body_marker"], DOCUMENT["end_marker"]]
+                              + [[s["num"], s["start_marker"]] for s in SECTIONS]
+                              + [section_markers.MATCHER_VERSION,
+                                 section_markers.MIN_MARKER_CONFIDENCE])
+    cached = pdf_text.load_markers(PDF, key)
+    if cached is not None:
+        return cached
 
-        # Find NOTES page (end of essay)
-        if re.search(r'^NOTES\s*$', text, re.MULTILINE):
-            if "NOTES" not in marker_pages:
-                marker_pages["NOTES"] = page_num
+    total = get_total_pages()
+    page_texts = pdf_text.get_pages(PDF, backend=backend, workers=workers)
+    marker_pages = scan_section_pages(page_texts[:total])
 
+    # Nothing extracted means nothing was scanned: do not cache that
+    if page_texts:
+        pdf_text.save_markers(PDF, key, marker_pages, total)
     return marker_pages, total
 
 
@@ -118,15 +175,16 @@ def compute_page_ranges(marker_pages, total_pages):
     Boundary pages (where the next section's heading appears) are included in
     both the current and next section, since they often contain trailing text
     from the current section above the heading.
-    Section 1 includes the title/poem page(s) before the body text starts.
-    Section 5 includes the page where NOTES starts (essay ends on that page).
+    The first section includes the title/poem page(s) before the body text
+    starts; the last includes the page where NOTES starts (essay ends on
+    that page).
     """
-    # Section 1 starts at page 1 (includes title/poem pages)
-    starts = {1: 1}
+    # The first section starts at page 1 (includes title/poem pages)
+    starts = {SECTIONS[0]["num"]: 1}
     for sec in SECTIONS[1:]:
         starts[sec["num"]] = marker_pages[sec["num"]]
 
-    notes_page = marker_pages.get("NOTES", total_pages)
+    notes_page = marker_pages.get(DOCUMENT["end_marker"], total_pages)
 
     ranges = {}
     section_nums = [s["num"] for s in SECTIONS]
@@ -147,65 +205,325 @@ def compute_page_ranges(marker_pages, total_pages):
 # Step 2: Split PDF into per-section files
 # ---------------------------------------------------------------------------
 
-def split_pdf(page_ranges):
-    """Extract page ranges into separate PDF files using pikepdf."""
+def section_pdf_path(num):
+    return SECTIONS_DIR / f"section-{num}.pdf"
+
+
+# pikepdf.save options for --optimize: recompress every stream pikepdf can
+# decode losslessly and pack small objects into compressed object streams
+OPTIMIZED_SAVE = dict(
+    compress_streams=True,
+    recompress_flate=True,
+    stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+)
+
+
+def downsample_image(image, scale):
+    """Resample one image XObject in place by scale (< 1).
+
+    Returns the number of bytes saved, or 0 if the image was left alone:
+    stencil masks, images whose filter PIL cannot decode (e.g. JBIG2 without
+    jbig2dec), and images that would not get any smaller.
+    """
+    from PIL import Image
+
+    if image.get("/ImageMask", False) or "/Decode" in image:
+        return 0
+    try:
+        pil = pikepdf.PdfImage(image).as_pil_image()
+    except (pikepdf.PdfError, NotImplementedError, pikepdf.DependencyError, ValueError):
+        return 0
+    size = (max(1, round(pil.width * scale)), max(1, round(pil.height * scale)))
+    if pil.mode == "1":
+        # Resample bilevel scans in greyscale, then threshold back to 1 bit
+        pil = pil.convert("L").resize(size, Image.LANCZOS).convert("1")
+    else:
+        if pil.mode not in ("L", "RGB"):
+            pil = pil.convert("RGB")
+        pil = pil.resize(size, Image.LANCZOS)
+
+    old_size = len(image.read_raw_bytes())
+    if image.get("/Filter") == pikepdf.Name.DCTDecode and pil.mode != "1":
+        buf = io.BytesIO()
+        pil.save(buf, "JPEG", quality=85)
+        data, filter_ = buf.getvalue(), pikepdf.Name.DCTDecode
+    else:
+        data, filter_ = zlib.compress(pil.tobytes(), 9), pikepdf.Name.FlateDecode
+    if len(data) >= old_size:
+        return 0
+
+    image.write(data, filter=filter_)
+    for key in ("/DecodeParms", "/JBIG2Globals"):
+        if key in image:
+            del image[key]
+    image.Width, image.Height = size
+    image.BitsPerComponent = 1 if pil.mode == "1" else 8
+    image.ColorSpace = pikepdf.Name.DeviceRGB if pil.mode == "RGB" else pikepdf.Name.DeviceGray
+    return old_size - len(data)
+
+
+def downsample_images(pdf, target_dpi):
+    """Downsample page images that are drawn above target_dpi.
+
+    An image's resolution is estimated against the page width, which is
+    exact for the full-page scans in the source PDF and conservative for
+    smaller images.
+    """
+    seen = set()
+    for page in pdf.pages:
+        x0, _, x1, _ = (float(v) for v in page.mediabox)
+        page_inches = (x1 - x0) / 72
+        xobjects = page.obj.get("/Resources", {}).get("/XObject", {})
+        for _, image in xobjects.items():
+            if image.get("/Subtype") != pikepdf.Name.Image or image.objgen in seen:
+                continue
+            seen.add(image.objgen)
+            dpi = int(image.Width) / page_inches
+            if dpi > target_dpi:
+                downsample_image(image, target_dpi / dpi)
+
+
+def write_section_pdf(job):
+    """Copy pages start..end (1-based, inclusive) of a PDF into out_path.
+
+    optimize: None for pikepdf's defaults, or {"image_dpi": N or None} to
+    drop unused resources, recompress streams, generate object streams and
+    optionally downsample images. Returns (default size, written size) in
+    bytes; both are the written size when not optimizing.
+    """
+    pdf_path, start, end, out_path, optimize = job
+    with pikepdf.open(pdf_path) as source:
+        dst = pikepdf.Pdf.new()
+        # pikepdf uses 0-based indexing
+        for page_idx in range(start - 1, end):
+            dst.pages.append(source.pages[page_idx])
+
+        # Deterministic /ID so serial and parallel builds are byte-identical
+        plain = io.BytesIO()
+        dst.save(plain, deterministic_id=True)
+        if optimize is None:
+            data = plain.getvalue()
+        else:
+            dst.remove_unreferenced_resources()
+            if optimize.get("image_dpi"):
+                downsample_images(dst, optimize["image_dpi"])
+            buf = io.BytesIO()
+            dst.save(buf, deterministic_id=True, **OPTIMIZED_SAVE)
+            data = buf.getvalue()
+
+    if isinstance(out_path, Path):
+        out_path.write_bytes(data)
+    else:
+        out_path.write(data)
+    return len(plain.getvalue()), len(data)
+
+
+def split_pdf(page_ranges, only=None, jobs=1, optimize=None):
+    """Extract page ranges into separate PDF files using pikepdf.
+
+    only: optional set of section numbers to write (default: all).
+    jobs: number of worker processes; each section is written independently.
+    optimize: optimization settings passed to write_section_pdf.
+    """
     SECTIONS_DIR.mkdir(parents=True, exist_ok=True)
 
+    todo = [sec["num"] for sec in SECTIONS if only is None or sec["num"] in only]
+    sizes = build_graph.parallel_map(
+        write_section_pdf,
+        [(PDF, *page_ranges[num], section_pdf_path(num), optimize) for num in todo],
+        jobs,
+    )
+    for num, (plain, written) in zip(todo, sizes):
+        start, end = page_ranges[num]
+        saved = ""
+        if optimize is not None:
+            saved = (f" ({written / 1024:.0f} KB, {plain - written:,} bytes saved, "
+                     f"{(plain - written) / plain:.1%})")
+        print(f"  Section {num}: pages {start}-{end} -> {section_pdf_path(num).name}{saved}")
+    if optimize is not None and sizes:
+        plain = sum(p for p, _ in sizes)
+        written = sum(w for _, w in sizes)
+        print(f"  Total: {written / 1024:.0f} KB, {plain - written:,} bytes saved "
+              f"({(plain - written) / plain:.1%})")
+
+
+def write_single_pdf(out_path):
+    """Write the whole source PDF linearized, with object streams.
+
+    Linearization ("fast web view") puts the first page and a hint table up
+    front, so a viewer opened at #page=N can fetch just that page with HTTP
+    range requests instead of downloading the whole file first.
+    """
+    OUTPUT.mkdir(parents=True, exist_ok=True)
     with pikepdf.open(PDF) as source:
-        for sec in SECTIONS:
-            num = sec["num"]
-            start, end = page_ranges[num]
-            out_path = SECTIONS_DIR / f"section-{num}.pdf"
+        source.save(out_path, linearize=True, compress_streams=True,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                    deterministic_id=True)
+
+
+def remove_other_pdf_layout(single):
+    """Delete the PDFs of the --pdf-output layout not being built.
+
+    source.pdf replaces sections/section-N.pdf and the other way round; a
+    leftover layout would otherwise be deployed as well. Their .gz/.br
+    copies go too. Returns the removed paths.
+    """
+    pattern = (f"{SECTIONS_DIR.name}/section-*.pdf" if single else SINGLE_PDF.name)
+    removed = []
+    for out in dict.fromkeys([OUTPUT, PUBLISH_DIR]):
+        for suffix in ("", ".gz", ".br"):
+            for path in sorted(out.glob(pattern + suffix)):
+                path.unlink()
+                removed.append(path)
+    return removed
+
+
+def pdf_size_report(page_ranges, optimize=None):
+    """Print the total size of the split section PDFs against the single PDF.
+
+    Both layouts are written to memory, so the report works whichever one
+    is being built.
+    """
+    split_total = 0
+    for sec in SECTIONS:
+        buf = io.BytesIO()
+        split_total += write_section_pdf((PDF, *page_ranges[sec["num"]], buf, optimize))[1]
+    buf = io.BytesIO()
+    write_single_pdf(buf)
+    single_total = len(buf.getvalue())
+    print(f"  split:  {len(SECTIONS)} files, {split_total / 1024:.0f} KB")
+    print(f"  single: 1 file, {single_total / 1024:.0f} KB "
+          f"({(split_total - single_total) / 1024:.0f} KB saved)")
+
 
-            dst = pikepdf.Pdf.new()
-            # pikepdf uses 0-based indexing
-            for page_idx in range(start - 1, end):
-                dst.pages.append(source.pages[page_idx])
-            dst.save(out_path)
+def section_pdf_link(num, start, single=False):
+    """URL and #fragment params for a section's pages, relative to the guide.
 
-            print(f"  Section {num}: pages {start}-{end} -> {out_path.name}")
+    With a single PDF the fragment opens it at the section's first page;
+    the viewer can still scroll past the section's end.
+    """
+    if single:
+        return SINGLE_PDF.relative_to(OUTPUT).as_posix(), f"page={start}"
+    return f"sections/{section_pdf_path(num).name}", ""
+
+
+def section_pdf_file(num, single=False):
+    """The PDF file a section's links point to (for its size)."""
+    return SINGLE_PDF if single else section_pdf_path(num)
+
+
+# ---------------------------------------------------------------------------
+# Step 2b: Render pages to images (--embed images)
+# ---------------------------------------------------------------------------
+
+# Rendered widths in CSS pixels, offered to the browser through srcset
+IMAGE_WIDTHS = (480, 800, 1200)
+
+
+def compute_page_info(pdf_path):
+    """Hash every page and record its size in points.
+
+    A page's hash covers a standalone one-page PDF holding just that page
+    and the resources it uses, so an edit elsewhere in the document leaves
+    its hash (and rendered images) unchanged.
+    """
+    info = []
+    with pikepdf.open(pdf_path) as source:
+        for page in source.pages:
+            single = pikepdf.Pdf.new()
+            single.pages.append(page)
+            buf = io.BytesIO()
+            single.save(buf, deterministic_id=True)
+            x0, y0, x1, y1 = (float(v) for v in page.mediabox)
+            info.append({
+                "hash": hashlib.sha256(buf.getvalue()).hexdigest()[:16],
+                "width": x1 - x0,
+                "height": y1 - y0,
+            })
+    return info
+
+
+def page_image_path(page_hash, width):
+    return PAGES_DIR / f"{page_hash}-{width}.png"
+
+
+def render_page_image(job):
+    """Rasterize one PDF page to a PNG of the given pixel width with pdftoppm."""
+    pdf_path, page_num, width, out_path = job
+    # pdftoppm appends the extension to the prefix; render to a temp name
+    # and rename so an interrupted build never leaves a truncated image
+    tmp_prefix = out_path.with_name(f"{out_path.stem}.{os.getpid()}.tmp")
+    subprocess.run(
+        ["pdftoppm", "-f", str(page_num), "-l", str(page_num), "-png",
+         "-scale-to-x", str(width), "-scale-to-y", "-1", "-singlefile",
+         str(pdf_path), str(tmp_prefix)],
+        check=True,
+    )
+    os.replace(tmp_prefix.with_name(tmp_prefix.name + ".png"), out_path)
+
+
+def render_page_images(page_ranges, jobs=1):
+    """Render every page used by a section at each of IMAGE_WIDTHS.
+
+    Images are named by page hash, so pages already rendered by an earlier
+    build are skipped. Returns {page_num: page info} for the rendered pages.
+    """
+    info = pdf_text.cached(PDF, "page-info", lambda: compute_page_info(PDF))
+    PAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+    pages = sorted({p for start, end in page_ranges.values() for p in range(start, end + 1)})
+    todo = [(PDF, p, width, page_image_path(info[p - 1]["hash"], width))
+            for p in pages for width in IMAGE_WIDTHS
+            if not page_image_path(info[p - 1]["hash"], width).exists()]
+    build_graph.parallel_map(render_page_image, todo, jobs)
+    print(f"  {len(pages)} pages, {len(todo)} images rendered, "
+          f"{len(pages) * len(IMAGE_WIDTHS) - len(todo)} reused")
+    return {p: info[p - 1] for p in pages}
 
 
 # ---------------------------------------------------------------------------
 # Step 3: Extract backgrounder/summary from analysis files
 # ---------------------------------------------------------------------------
 
-def extract_section1_parts(filepath):
-    """Extract backgrounder and after-reading from the main comprehension file."""
-    text = filepath.read_text()
+def extract_section_parts(filepath, num):
+    """Extract backgrounder and after-reading for one section of a pass file.
 
-    # Find Section 1 content (between "## Section 1:" and "## Section 2:")
-    start = text.find("## Section 1:")
-    end = text.find("## Section 2:")
-    if start == -1 or end == -1:
+    The section is the "## Section N: ..." heading; Backgrounder runs up to
+    its Summary, and everything from Summary to the next section is read
+    after the text.
+    """
+    outline = md_outline.load_outline(filepath)
+    section = outline.find(f"Section {num}", level=2)
+    if section is None:
         return "", ""
-    section_text = text[start:end].strip()
 
-    bg_start = section_text.find("### Backgrounder")
-    summary_start = section_text.find("### Summary")
-    if bg_start == -1 or summary_start == -1:
-        return section_text, ""
+    bg = outline.find("Backgrounder", level=3, within=section)
+    summary = outline.find("Summary", level=3, within=section)
+    if bg is None or summary is None:
+        return outline.slice(section).strip(), ""
 
-    backgrounder = section_text[bg_start:summary_start].strip()
-    after_reading = section_text[summary_start:].strip()
+    backgrounder = outline.between(bg, summary).strip()
+    after_reading = outline.text[summary.start:section.end].strip()
     return backgrounder, after_reading
 
 
 def extract_standalone_parts(filepath):
-    """Extract backgrounder and after-reading from a standalone analysis file."""
-    text = filepath.read_text()
-
-    bg_start = text.find("## Backgrounder")
-    if bg_start == -1:
-        bg_start = text.find("### Backgrounder")
+    """Extract backgrounder and after-reading from a standalone analysis file.
 
-    summary_start = text.find("## Summary")
-    if summary_start == -1:
-        summary_start = text.find("### Summary")
+    The parts may be ## or ### headings; either way they start as ## in the
+    guide, so Backgrounder and Summary always render at the same level.
+    """
+    outline = md_outline.load_outline(filepath)
+    text = outline.text
 
-    if bg_start == -1 or summary_start == -1:
+    bg = outline.find("Backgrounder", level=2) or outline.find("Backgrounder", level=3)
+    summary = outline.find("Summary", level=2) or outline.find("Summary", level=3)
+    if bg is None or summary is None:
         return text, ""
 
+    bg_start = bg.start + bg.level - 2
+    summary_start = summary.start + summary.level - 2
     backgrounder = text[bg_start:summary_start].strip()
     after_reading = text[summary_start:].strip()
     return backgrounder, after_reading
@@ -216,8 +534,27 @@ def extract_standalone_parts(filepath):
 # ---------------------------------------------------------------------------
 
 def md_to_html(md_text):
-    """Convert markdown text to HTML."""
-    return markdown.markdown(md_text, extensions=["tables", "fenced_code"])
+    """Convert markdown text to HTML (memoized per fragment, see md_render)."""
+    return md_render.render(md_text, extensions=("tables", "fenced_code"))
+
+
+def source_text_html(sec, start, single=False):
+    """Render a section's cleaned source text, minus its own title heading.
+
+    Paragraphs are single lines in the cleaned markdown, so nl2br only
+    affects multi-line blocks: it keeps the epigraph's verse line breaks.
+    """
+    text = sec["source"].read_text()
+    if text.startswith("# "):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    body = md_render.render(text, extensions=("nl2br",))
+    url, fragment = section_pdf_link(sec["num"], start, single)
+    href = f"{url}#{fragment}" if fragment else url
+    size_kb = section_pdf_file(sec["num"], single).stat().st_size / 1024
+    return f"""<div class="source-text">
+        {body}
+        </div>
+        <p class="pdf-download"><a href="{href}">View the original pages as PDF ({size_kb:.0f} KB)</a></p>"""
 
 
 def estimate_pdf_height(num_pages):
@@ -229,28 +566,178 @@ def estimate_pdf_height(num_pages):
     return 900
 
 
-def build_html(page_ranges):
-    """Generate the study guide HTML file."""
-    sections_html = []
+def page_images_html(num, pages, single=False):
+    """Responsive, lazily loaded page images plus a link to the section PDF."""
+    default_width = IMAGE_WIDTHS[len(IMAGE_WIDTHS) // 2]
+    imgs = []
+    for page_num, page in pages:
+        srcset = ", ".join(
+            f"pages/{page['hash']}-{w}.png {w}w" for w in IMAGE_WIDTHS)
+        # width/height give the browser the aspect ratio before the image loads
+        height = round(default_width * page["height"] / page["width"])
+        imgs.append(
+            f'<img class="page-image" src="pages/{page["hash"]}-{default_width}.png" '
+            f'srcset="{srcset}" sizes="(max-width: 56rem) 100vw, 52rem" '
+            f'width="{default_width}" height="{height}" loading="lazy" decoding="async" '
+            f'alt="Page {page_num} of the original document">')
+    url, fragment = section_pdf_link(num, pages[0][0], single)
+    href = f"{url}#{fragment}" if fragment else url
+    size_kb = section_pdf_file(num, single).stat().st_size / 1024
+    imgs.append(f'<p class="pdf-download"><a href="{href}" download>'
+                f'Download these pages as PDF ({size_kb:.0f} KB)</a></p>')
+    return "\n        ".join(imgs)
+
+
+def pdf_viewer_html(num, start, num_pages, embed, pages=None, single=False):
+    """HTML for a section's PDF: a direct <embed>, a lazy placeholder, or images.
+
+    The lazy placeholder reserves the viewer's height and shows the page
+    count and file size; LAZY_EMBED_SCRIPT swaps in the real <embed> when it
+    scrolls into view or is clicked. In images mode, pages is a list of
+    (page_num, page info) from render_page_images. single points the viewer
+    at the section's first page of the single PDF (see section_pdf_link).
+    """
+    url, fragment = section_pdf_link(num, start, single)
+    src = f"{url}#{'&'.join(filter(None, [fragment, 'toolbar=0&view=FitH']))}"
+    pdf_height = estimate_pdf_height(num_pages)
+    if embed == "eager":
+        return f"""<embed src="{src}" type="application/pdf"
+               width="100%" height="{pdf_height}px">"""
+    if embed == "images":
+        return page_images_html(num, pages, single)
+
+    size_kb = section_pdf_file(num, single).stat().st_size / 1024
+    return f"""<div class="pdf-lazy" data-src="{src}" data-height="{pdf_height}" style="height: {pdf_height}px">
+          <button type="button">Show the original pages ({num_pages} page{'s' if num_pages != 1 else ''}, {size_kb:.0f} KB PDF)</button>
+        </div>"""
+
+
+LAZY_EMBED_CSS = """
+
+    .pdf-lazy {
+      display: flex;
+      align-items: center;
+      justify-content: center;
+      border: 1px solid #ccc;
+      border-radius: 4px;
+      background: #f4f3ef;
+    }
 
-    for sec in SECTIONS:
-        num = sec["num"]
-        title = sec["title"]
-        start, end = page_ranges[num]
-        num_pages = end - start + 1
+    .pdf-lazy button {
+      font: inherit;
+      font-size: 0.9rem;
+      color: #444;
+      background: #fff;
+      border: 1px solid #c9a96e;
+      border-radius: 4px;
+      padding: 0.6rem 1.2rem;
+      cursor: pointer;
+    }"""
 
-        # Extract analysis content
-        if sec["analysis_type"] == "main":
-            backgrounder_md, after_md = extract_section1_parts(sec["analysis"])
-        else:
-            backgrounder_md, after_md = extract_standalone_parts(sec["analysis"])
+PAGE_IMAGE_CSS = """
+
+    .page-image {
+      display: block;
+      width: 100%;
+      height: auto;
+      margin-bottom: 0.5rem;
+      border: 1px solid #ccc;
+      border-radius: 4px;
+      background: #fff;
+    }"""
+
+PDF_DOWNLOAD_CSS = """
+
+    .pdf-download {
+      font-size: 0.85rem;
+      font-style: italic;
+    }"""
 
-        backgrounder_html = md_to_html(backgrounder_md)
-        after_html = md_to_html(after_md)
+SOURCE_TEXT_CSS = """
 
-        pdf_height = estimate_pdf_height(num_pages)
+    .source-text {
+      background: #fff;
+      border: 1px solid #e0ddd4;
+      border-radius: 4px;
+      padding: 1.5rem 2rem;
+      margin-bottom: 0.5rem;
+    }
 
-        section = f"""
+    .source-text p {
+      margin: 0 0 0.9rem 0;
+      text-align: justify;
+      text-indent: 1.5em;
+    }
+
+    .source-text blockquote p {
+      text-indent: 0;
+    }"""
+
+# Extra stylesheet rules per embed mode
+EMBED_CSS = {
+    "lazy": LAZY_EMBED_CSS,
+    "images": PAGE_IMAGE_CSS + PDF_DOWNLOAD_CSS,
+    "inline": SOURCE_TEXT_CSS + PDF_DOWNLOAD_CSS,
+}
+
+LAZY_EMBED_SCRIPT = """
+  <script>
+    (function () {
+      function load(box) {
+        if (box.dataset.loaded) return;
+        box.dataset.loaded = "1";
+        var embed = document.createElement("embed");
+        embed.src = box.dataset.src;
+        embed.type = "application/pdf";
+        embed.width = "100%";
+        embed.height = box.dataset.height + "px";
+        box.replaceWith(embed);
+      }
+      var boxes = document.querySelectorAll(".pdf-lazy");
+      boxes.forEach(function (box) {
+        box.addEventListener("click", function () { load(box); });
+      });
+      if ("IntersectionObserver" in window) {
+        var observer = new IntersectionObserver(function (entries) {
+          entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+              observer.unobserve(entry.target);
+              load(entry.target);
+            }
+          });
+        }, {rootMargin: "200px 0px"});
+        boxes.forEach(function (box) { observer.observe(box); });
+      }
+    })();
+  </script>"""
+
+
+# How "The Text" is described in the guide's introduction, if not as pages
+TEXT_DISPLAY = {"inline": "as cleaned-up text with a link to the original pages"}
+
+
+def render_section(job):
+    """Render one section's HTML fragment (analysis parts + embedded PDF)."""
+    sec, (start, end), embed, pages, single = job
+    num = sec["num"]
+    title = sec["title"]
+    num_pages = end - start + 1
+
+    # Extract analysis content
+    if sec["analysis_type"] == "main":
+        backgrounder_md, after_md = extract_section_parts(sec["analysis"], num)
+    else:
+        backgrounder_md, after_md = extract_standalone_parts(sec["analysis"])
+
+    backgrounder_html = md_to_html(backgrounder_md)
+    after_html = md_to_html(after_md)
+
+    if embed == "inline":
+        viewer_html = source_text_html(sec, start, single)
+    else:
+        viewer_html = pdf_viewer_html(num, start, num_pages, embed, pages, single)
+
+    return f"""
     <section id="section-{num}">
       <h1>Section {num}: {title}</h1>
 
@@ -262,8 +749,7 @@ def build_html(page_ranges):
       <div class="original-text">
         <h2>The Text</h2>
         <p class="pdf-info">Pages {start}&ndash;{end} of the original document ({num_pages} page{'s' if num_pages != 1 else ''})</p>
-        <embed src="sections/section-{num}.pdf#toolbar=0&view=FitH" type="application/pdf"
-               width="100%" height="{pdf_height}px">
+        {viewer_html}
       </div>
 
       <div class="after-reading">
@@ -271,28 +757,14 @@ def build_html(page_ranges):
         {after_html}
       </div>
     </section>"""
-        sections_html.append(section)
 
-    # Build navigation
-    nav_links = []
-    for sec in SECTIONS:
-        nav_links.append(
-            f'<a href="#section-{sec["num"]}">{sec["num"]}. {sec["title"]}</a>'
-        )
-    nav_html = "\n        ".join(nav_links)
 
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1">
-  <title>The Straussian Moment &mdash; Study Guide</title>
-  <style>
-    * {{
+GUIDE_CSS = """
+    * {
       box-sizing: border-box;
-    }}
+    }
 
-    body {{
+    body {
       font-family: Georgia, 'Times New Roman', serif;
       font-size: 16px;
       line-height: 1.7;
@@ -300,29 +772,29 @@ def build_html(page_ranges):
       background: #fafaf8;
       margin: 0;
       padding: 0;
-    }}
+    }
 
-    header {{
+    header {
       background: #2c2c2c;
       color: #f0ede6;
       padding: 2.5rem 2rem;
       text-align: center;
-    }}
+    }
 
-    header h1 {{
+    header h1 {
       font-size: 2rem;
       margin: 0 0 0.3rem 0;
       font-weight: normal;
       letter-spacing: 0.02em;
-    }}
+    }
 
-    header .subtitle {{
+    header .subtitle {
       font-size: 1rem;
       color: #b8b4a8;
       font-style: italic;
-    }}
+    }
 
-    nav {{
+    nav {
       background: #3a3a3a;
       padding: 1rem 2rem;
       text-align: center;
@@ -330,9 +802,9 @@ def build_html(page_ranges):
       top: 0;
       z-index: 100;
       border-bottom: 1px solid #555;
-    }}
+    }
 
-    nav a {{
+    nav a {
       color: #d4d0c8;
       text-decoration: none;
       margin: 0 0.8rem;
@@ -340,45 +812,45 @@ def build_html(page_ranges):
       padding: 0.3rem 0;
       border-bottom: 2px solid transparent;
       transition: border-color 0.2s, color 0.2s;
-    }}
+    }
 
-    nav a:hover {{
+    nav a:hover {
       color: #fff;
       border-bottom-color: #c9a96e;
-    }}
+    }
 
-    .intro {{
+    .intro {
       max-width: 48rem;
       margin: 2rem auto;
       padding: 0 2rem;
-    }}
+    }
 
-    .intro h2 {{
+    .intro h2 {
       font-size: 1.3rem;
       color: #333;
       margin-bottom: 0.5rem;
-    }}
+    }
 
-    .intro p, .intro li {{
+    .intro p, .intro li {
       font-size: 0.95rem;
       color: #444;
-    }}
+    }
 
-    section {{
+    section {
       max-width: 56rem;
       margin: 0 auto 3rem auto;
       padding: 0 2rem;
-    }}
+    }
 
-    section h1 {{
+    section h1 {
       font-size: 1.8rem;
       color: #2c2c2c;
       border-bottom: 2px solid #c9a96e;
       padding-bottom: 0.4rem;
       margin-top: 3rem;
-    }}
+    }
 
-    section h2 {{
+    section h2 {
       font-size: 1.3rem;
       color: #444;
       margin-top: 2rem;
@@ -386,124 +858,172 @@ def build_html(page_ranges):
       text-transform: uppercase;
       letter-spacing: 0.05em;
       font-weight: normal;
-    }}
+    }
 
-    .before-reading, .after-reading {{
+    .before-reading, .after-reading {
       background: #fff;
       border: 1px solid #e0ddd4;
       border-radius: 4px;
       padding: 1.5rem 2rem;
       margin: 1rem 0;
-    }}
+    }
 
-    .before-reading h3, .after-reading h3 {{
+    .before-reading h3, .after-reading h3 {
       font-size: 1.1rem;
       color: #555;
       margin-top: 1.5rem;
       margin-bottom: 0.5rem;
-    }}
+    }
 
-    .before-reading h4, .after-reading h4 {{
+    .before-reading h4, .after-reading h4 {
       font-size: 1rem;
       color: #666;
       margin-top: 1.2rem;
       margin-bottom: 0.4rem;
       font-style: italic;
-    }}
+    }
 
-    .before-reading p, .after-reading p {{
+    .before-reading p, .after-reading p {
       margin-bottom: 0.8rem;
       text-align: justify;
-    }}
+    }
 
     .before-reading ul, .after-reading ul,
-    .before-reading ol, .after-reading ol {{
+    .before-reading ol, .after-reading ol {
       margin-bottom: 0.8rem;
       padding-left: 1.5rem;
-    }}
+    }
 
-    .before-reading li, .after-reading li {{
+    .before-reading li, .after-reading li {
       margin-bottom: 0.4rem;
-    }}
+    }
 
-    blockquote {{
+    blockquote {
       margin: 1em 0;
       padding: 0.5em 1.2em;
       border-left: 3px solid #c9a96e;
       background: #f9f8f4;
       font-style: italic;
       color: #555;
-    }}
+    }
 
-    .original-text {{
+    .original-text {
       margin: 1.5rem 0;
-    }}
+    }
 
-    .pdf-info {{
+    .pdf-info {
       font-size: 0.85rem;
       color: #888;
       margin-bottom: 0.5rem;
       font-style: italic;
-    }}
+    }
 
-    embed {{
+    embed {
       border: 1px solid #ccc;
       border-radius: 4px;
       background: #fff;
-    }}
+    }
 
-    table {{
+    table {
       border-collapse: collapse;
       width: 100%;
       margin: 1em 0;
       font-size: 0.9rem;
-    }}
+    }
 
-    th, td {{
+    th, td {
       border: 1px solid #ddd;
       padding: 0.6rem 0.8rem;
       text-align: left;
       vertical-align: top;
-    }}
+    }
 
-    th {{
+    th {
       background: #f5f3ee;
       font-weight: bold;
       color: #444;
-    }}
+    }
 
-    hr {{
+    hr {
       border: none;
       border-top: 1px solid #ddd;
       margin: 2rem 0;
-    }}
+    }
 
-    strong {{
+    strong {
       color: #222;
-    }}
+    }
 
-    code {{
+    code {
       font-family: 'Menlo', 'Courier New', monospace;
       font-size: 0.88em;
       background: #f4f3ef;
       padding: 1px 5px;
       border-radius: 3px;
-    }}
+    }
 
-    footer {{
+    footer {
       text-align: center;
       padding: 2rem;
       color: #999;
       font-size: 0.85rem;
       border-top: 1px solid #e0ddd4;
       margin-top: 3rem;
-    }}
-  </style>
+    }"""
+
+
+# Rules for what is on screen before the first section (header, nav, intro);
+# with --production only these are inlined and the rest is loaded from a file
+CRITICAL_SELECTORS = {"*", "body", "header", "nav", ".intro"}
+
+
+def guide_stylesheet(embed="eager"):
+    """The guide's CSS split for --production: (inline critical, external)."""
+    critical, rest = web_assets.split_css(GUIDE_CSS, CRITICAL_SELECTORS)
+    return (web_assets.minify_css(critical),
+            web_assets.minify_css(rest + EMBED_CSS.get(embed, "")))
+
+
+def stylesheet_path(embed="eager"):
+    """Fingerprinted path of the external stylesheet for an embed mode."""
+    return ASSETS_DIR / web_assets.fingerprinted_name("guide", ".css",
+                                                      guide_stylesheet(embed)[1])
+
+
+def write_stylesheet(embed="eager"):
+    path = stylesheet_path(embed)
+    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(guide_stylesheet(embed)[1])
+    return path
+
+
+def guide_head(nav_html, embed="eager", production=False):
+    """Everything before the first section: head, styles, header, nav, intro.
+
+    production inlines only the critical rules and loads the rest from the
+    fingerprinted stylesheet without blocking the first paint.
+    """
+    if production:
+        critical = guide_stylesheet(embed)[0]
+        href = stylesheet_path(embed).relative_to(OUTPUT).as_posix()
+        styles = f"""<style>{critical}</style>
+  <link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel='stylesheet'">
+  <noscript><link rel="stylesheet" href="{href}"></noscript>"""
+    else:
+        styles = f"""<style>{GUIDE_CSS}{EMBED_CSS.get(embed, "")}
+  </style>"""
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>{DOCUMENT["title"]} &mdash; Study Guide</title>
+  {styles}
 </head>
 <body>
   <header>
-    <h1>The Straussian Moment</h1>
-    <div class="subtitle">Peter Thiel (2007) &mdash; Study Guide</div>
+    <h1>{DOCUMENT["title"]}</h1>
+    <div class="subtitle">{DOCUMENT["subtitle"]} &mdash; Study Guide</div>
   </header>
 
   <nav>
@@ -515,49 +1035,421 @@ def build_html(page_ranges):
     <p>For each section of the essay, this guide provides three parts in reading order:</p>
     <ol>
       <li><strong>Before You Read</strong> &mdash; Background on the thinkers and concepts you'll encounter. Read this first to orient yourself.</li>
-      <li><strong>The Text</strong> &mdash; Thiel's actual essay, displayed as the original typeset pages. Read it carefully, noting what's clear and what's confusing.</li>
+      <li><strong>The Text</strong> &mdash; {DOCUMENT["text_label"]}, {TEXT_DISPLAY.get(embed, "displayed as the original typeset pages")}. Read it carefully, noting what's clear and what's confusing.</li>
       <li><strong>After You Read</strong> &mdash; A summary, glossary of key terms, a paraphrase test, and open questions. Use these to check and deepen your understanding.</li>
     </ol>
     <p>Take your time with each section before moving to the next.</p>
   </div>
 
-  {"".join(sections_html)}
+  """
+
+
+def guide_foot(embed="eager"):
+    """Everything after the last section."""
+    return f"""
 
   <footer>
     Layered Lenses Deep Reading Framework &mdash; Pass 1: Comprehension
-  </footer>
+  </footer>{LAZY_EMBED_SCRIPT if embed == "lazy" else ""}
 </body>
 </html>"""
 
-    output_path = OUTPUT / "study-guide.html"
-    output_path.write_text(html)
-    return output_path
+
+def fragment_path(num):
+    return FRAGMENTS_DIR / f"section-{num}.html"
+
+
+def build_html(page_ranges, jobs=1, embed="eager", page_images=None, single=False,
+               reuse=(), production=False):
+    """Generate the study guide HTML file.
+
+    The page is streamed to disk piece by piece: head and nav, then each
+    section fragment as soon as it is rendered, then the footer. Fragments
+    are rendered on up to `jobs` worker processes and kept in FRAGMENTS_DIR;
+    sections in `reuse` are spliced in from there instead of re-rendered.
+
+    embed="lazy" replaces each PDF viewer with a placeholder that loads it
+    on demand; embed="images" shows the pre-rendered page_images instead
+    (see pdf_viewer_html), and embed="inline" the cleaned source text (see
+    source_text_html). single links sections into SINGLE_PDF instead of
+    their own files. production links the external stylesheet (which must
+    already be written, see write_stylesheet) and minifies the page;
+    fragments are cached unminified either way.
+    """
+    emit = web_assets.minify_html if production else str
+    jobs_list = []
+    for sec in SECTIONS:
+        if sec["num"] in reuse:
+            continue
+        start, end = page_ranges[sec["num"]]
+        pages = ([(p, page_images[p]) for p in range(start, end + 1)]
+                 if embed == "images" else None)
+        jobs_list.append((sec, (start, end), embed, pages, single))
+    # Workers may re-import this module (spawn): point them at this document
+    rendered = build_graph.parallel_imap(render_section, jobs_list, jobs,
+                                         configure, (DOCUMENT, HASH_ASSETS))
+
+    # Build navigation
+    nav_links = []
+    for sec in SECTIONS:
+        nav_links.append(
+            f'<a href="#section-{sec["num"]}">{sec["num"]}. {sec["title"]}</a>'
+        )
+    nav_html = "\n        ".join(nav_links)
+
+    FRAGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = GUIDE.with_name(f"{GUIDE.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as out:
+        out.write(emit(guide_head(nav_html, embed, production)))
+        for sec in SECTIONS:
+            path = fragment_path(sec["num"])
+            if sec["num"] in reuse:
+                fragment = path.read_text()
+            else:
+                fragment = next(rendered)
+                path.write_text(fragment)
+            out.write(emit(fragment))
+        out.write(emit(guide_foot(embed)))
+    os.replace(tmp, GUIDE)
+    return GUIDE
 
 
 # ---------------------------------------------------------------------------
-# Main
+# Step 5: Publish content-hashed assets (--hash-assets)
 # ---------------------------------------------------------------------------
 
-def main():
-    print("Finding section page boundaries...")
-    marker_pages, total_pages = find_section_pages()
-    print(f"  PDF has {total_pages} pages")
-    for key, page in sorted(marker_pages.items(), key=lambda x: x[1]):
-        print(f"  {key}: page {page}")
+def publish_assets(assets):
+    """Copy the site built in OUTPUT to PUBLISH_DIR under content-hashed names.
+
+    assets: the files in OUTPUT the guide links to. The guide keeps its name
+    and its links are rewritten; page images are already named by page hash.
+    Prints and returns what publish() did.
+    """
+    assets = [path.relative_to(OUTPUT).as_posix() for path in assets]
+    manifest, removed = web_assets.publish(OUTPUT, PUBLISH_DIR, pages=[GUIDE.name],
+                                           assets=assets, keep=[f"{PAGES_DIR.name}/"])
+    for built, published in manifest.items():
+        if built != published:
+            print(f"  {built} -> {published}")
+    print(f"  {len(manifest)} files in {web_assets.ASSET_MANIFEST}, "
+          f"{len(removed)} orphaned file{'s' if len(removed) != 1 else ''} removed")
+    return manifest, removed
+
 
-    print("\nComputing page ranges...")
-    page_ranges = compute_page_ranges(marker_pages, total_pages)
+# ---------------------------------------------------------------------------
+# Incremental builds
+# ---------------------------------------------------------------------------
+
+# Modules whose code shapes the output, besides this script
+BUILD_MODULES = (build_graph, build_metrics, documents, md_outline, md_render,
+                 pdf_text, preview_server, section_markers, web_assets)
+
+
+def build_code_files():
+    """This script and the source files of BUILD_MODULES."""
+    return [Path(__file__).resolve()] + [Path(m.__file__).resolve() for m in BUILD_MODULES]
+
+
+def build_code_digest(manifest):
+    """One digest over all the build code, so any code change rebuilds."""
+    return build_graph.sha256_text("\n".join(manifest.file_digest(path)
+                                             for path in build_code_files()))
+
+
+def artifact_inputs(manifest, page_ranges, embed="eager", single=False, optimize=None,
+                    production=False):
+    """Map each artifact to the digests of the inputs it is built from."""
+    common = {
+        "sections": pdf_text.config_key(SECTIONS),
+        "script": build_code_digest(manifest),
+    }
+    pdf_digest = manifest.file_digest(PDF)
+
+    inputs = {}
+    if single:
+        inputs[SINGLE_PDF] = dict(common, pdf=pdf_digest)
+    else:
+        for sec in SECTIONS:
+            num = sec["num"]
+            inputs[section_pdf_path(num)] = dict(
+                common, pdf=pdf_digest, pages=list(page_ranges[num]))
+            if optimize is not None:
+                inputs[section_pdf_path(num)]["optimize"] = optimize
     for sec in SECTIONS:
         num = sec["num"]
-        start, end = page_ranges[num]
-        print(f"  Section {num}: pages {start}-{end}")
+        deps = inputs[fragment_path(num)] = dict(
+            common,
+            pages=list(page_ranges[num]),
+            analysis=manifest.file_digest(sec["analysis"]),
+            embed=embed,
+        )
+        if single:
+            deps["pdf_output"] = "single"
+        if embed != "eager":
+            # Placeholders and links show the section PDF's size, which also
+            # depends on --optimize; images are named by page hash
+            deps["pdf"] = pdf_digest
+            if optimize is not None and not single:
+                deps["optimize"] = optimize
+        if embed == "inline":
+            deps["source"] = manifest.file_digest(sec["source"])
+    # The page itself: head/nav/footer, plus every fragment it splices in
+    inputs[GUIDE] = dict(
+        common,
+        embed=embed,
+        fragments={str(fragment_path(sec["num"])): inputs[fragment_path(sec["num"])]
+                   for sec in SECTIONS},
+    )
+    if production:
+        inputs[GUIDE]["production"] = True
+        # Named by its content, so only its existence needs tracking
+        inputs[stylesheet_path(embed)] = dict(common, embed=embed)
+    return inputs
+
+
+# ---------------------------------------------------------------------------
+# Watch mode
+# ---------------------------------------------------------------------------
+
+WATCH_INTERVAL = 0.2  # seconds between checks for changed inputs
+
 
-    print("\nSplitting PDF into per-section files...")
-    split_pdf(page_ranges)
+def file_stamps(paths):
+    """(size, mtime) of each path, or None for a missing file."""
+    stamps = {}
+    for path in paths:
+        try:
+            st = path.stat()
+            stamps[path] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamps[path] = None
+    return stamps
 
-    print("\nGenerating HTML study guide...")
-    output_path = build_html(page_ranges)
-    print(f"\nDone! Open in browser: {output_path}")
+
+def watch(args, page_ranges, port=8000):
+    """Serve the guide with live reload and rebuild whenever an input changes.
+
+    Analysis (and, with --embed inline, source text) edits rebuild just the
+    affected fragments through the incremental manifest, reusing the page
+    ranges; a PDF change finds the ranges again and re-splits only the
+    sections whose pages changed. A change to the document manifest or the
+    build code restarts the whole process; the build code is part of every
+    artifact's inputs (see build_code_digest), so the restarted build then
+    rebuilds what that code produces.
+    """
+    restart = build_code_files() + [DOCUMENT["manifest"]]
+    content = [sec["analysis"] for sec in SECTIONS]
+    if args.embed == "inline":
+        content += [sec["source"] for sec in SECTIONS]
+    paths = restart + [PDF] + content
+
+    server = preview_server.serve(PUBLISH_DIR, port)
+    print(f"\nPreview: http://127.0.0.1:{port}/{GUIDE.name}")
+    print(f"Watching {len(paths)} files for changes (Ctrl-C to stop)...")
+    seen = file_stamps(paths)
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            stamps = file_stamps(paths)
+            changed = [path for path in paths if stamps[path] != seen[path]]
+            seen = stamps
+            # A missing file is mid-save (written to a temp name and renamed)
+            if not changed or any(stamps[path] is None for path in changed):
+                continue
+
+            names = ", ".join(path.name for path in changed)
+            if any(path in restart for path in changed):
+                print(f"\n{names} changed: restarting...")
+                server.shutdown()
+                server.server_close()
+                os.execv(sys.executable, [sys.executable] + sys.argv)
+
+            print(f"\n{names} changed: rebuilding...")
+            t0 = time.perf_counter()
+            try:
+                page_ranges, rebuilt = run_build(
+                    args, build_metrics.Metrics("build-html.py"),
+                    None if PDF in changed else page_ranges)
+            except (Exception, SystemExit) as e:
+                # Keep watching: the next save may fix it
+                print(f"  Build failed: {e!r}")
+                continue
+            if rebuilt:
+                server.live_reload.notify()
+            print(f"  Rebuilt in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def run_build(args, metrics, page_ranges=None):
+    """One build pass over the configured document, as the options ask.
+
+    page_ranges: reuse an earlier pass's ranges (the PDF has not changed)
+    instead of finding them again. Returns (page_ranges, number of
+    artifacts rebuilt).
+    """
+    single = args.pdf_output == "single"
+    optimize = {"image_dpi": args.image_dpi} if args.optimize else None
+
+    if page_ranges is None:
+        print("Finding section page boundaries...")
+        with metrics.stage("find_section_pages"):
+            marker_pages, total_pages = find_section_pages(backend=args.backend,
+                                                           workers=args.workers)
+        print(f"  PDF has {total_pages} pages")
+        for key, page in sorted(marker_pages.items(), key=lambda x: x[1]):
+            print(f"  {key}: page {page}")
+
+        print("\nComputing page ranges...")
+        with metrics.stage("compute_page_ranges"):
+            page_ranges = compute_page_ranges(marker_pages, total_pages)
+        for sec in SECTIONS:
+            num = sec["num"]
+            start, end = page_ranges[num]
+            print(f"  Section {num}: pages {start}-{end}")
+
+    manifest = build_graph.Manifest(MANIFEST)
+    inputs = artifact_inputs(manifest, page_ranges, embed=args.embed, single=single,
+                             optimize=optimize, production=args.production)
+    stale = {path for path, deps in inputs.items()
+             if not (args.incremental and manifest.is_fresh(path, deps))}
+
+    stale_sections = {sec["num"] for sec in SECTIONS if section_pdf_path(sec["num"]) in stale}
+    if stale_sections:
+        print("\nSplitting PDF into per-section files...")
+        with metrics.stage("split_pdf"):
+            split_pdf(page_ranges, only=stale_sections, jobs=args.jobs, optimize=optimize)
+    if SINGLE_PDF in stale:
+        print("\nWriting linearized source PDF...")
+        with metrics.stage("write_single_pdf"):
+            write_single_pdf(SINGLE_PDF)
+        print(f"  {SINGLE_PDF.name}: {SINGLE_PDF.stat().st_size / 1024:.0f} KB")
+    removed = remove_other_pdf_layout(single)
+    if removed:
+        print(f"\nRemoving {'split' if single else 'single'} PDF output...")
+        for path in removed:
+            print(f"  {path}")
+    if args.pdf_size_report:
+        print("\nPDF output size:")
+        pdf_size_report(page_ranges, optimize=optimize)
+
+    page_images = None
+    if args.embed == "images":
+        print("\nRendering page images...")
+        with metrics.stage("render_page_images"):
+            page_images = render_page_images(page_ranges, jobs=args.jobs)
+
+    if args.production and stylesheet_path(args.embed) in stale:
+        print(f"\nWriting {write_stylesheet(args.embed).relative_to(OUTPUT)}")
+
+    if GUIDE in stale:
+        print("\nGenerating HTML study guide...")
+        reuse = {sec["num"] for sec in SECTIONS if fragment_path(sec["num"]) not in stale}
+        with metrics.stage("build_html"):
+            build_html(page_ranges, jobs=args.jobs, embed=args.embed,
+                       page_images=page_images, single=single, reuse=reuse,
+                       production=args.production)
+        print(f"  {len(SECTIONS) - len(reuse)} sections rendered, {len(reuse)} reused")
+        md_render.prune()
+
+    for path in stale:
+        manifest.record(path, inputs[path])
+    manifest.save()
+
+    if args.hash_assets:
+        print("\nPublishing content-hashed assets...")
+        assets = [SINGLE_PDF] if single else [section_pdf_path(sec["num"]) for sec in SECTIONS]
+        if args.production:
+            assets.append(stylesheet_path(args.embed))
+        if page_images:
+            assets += [page_image_path(info["hash"], width)
+                       for info in page_images.values() for width in IMAGE_WIDTHS]
+        with metrics.stage("publish_assets"):
+            publish_assets(assets)
+
+    if args.production:
+        print("\nPrecompressing output...")
+        with metrics.stage("precompress"):
+            compressed = web_assets.precompress(PUBLISH_DIR, jobs=args.jobs)
+        for path, (size, encoded) in compressed.items():
+            sizes = ", ".join(f"{ext} {n / 1024:.0f} KB" for ext, n in encoded.items())
+            print(f"  {path.relative_to(PUBLISH_DIR)}: {size / 1024:.0f} KB -> {sizes}")
+        if not web_assets.have_brotli():
+            print("  (brotli is not installed: wrote .gz files only)")
+    else:
+        # A production build's .gz/.br of files rewritten since are now stale
+        removed = web_assets.remove_stale_compressed(PUBLISH_DIR)
+        if removed:
+            print("\nRemoving outdated precompressed files...")
+            for path in removed:
+                print(f"  {path.relative_to(PUBLISH_DIR)}")
+
+    if not stale:
+        print("\nUp to date.")
+    return page_ranges, len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document", type=Path, default=documents.DEFAULT_MANIFEST,
+                        help="document manifest to build")
+    parser.add_argument("--backend", choices=sorted(pdf_text.BACKENDS),
+                        default=pdf_text.DEFAULT_BACKEND,
+                        help="PDF text extraction backend")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="extract page chunks on N worker processes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild artifacts whose inputs changed")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="process sections on N worker processes")
+    parser.add_argument("--embed", choices=["eager", "lazy", "images", "inline"],
+                        default="eager",
+                        help="embed PDFs directly, load each viewer on demand, "
+                             "show pre-rendered page images, or inline the "
+                             "cleaned source text")
+    parser.add_argument("--pdf-output", choices=["split", "single"], default="split",
+                        help="one PDF per section, or one linearized PDF "
+                             "linked with #page=N")
+    parser.add_argument("--pdf-size-report", action="store_true",
+                        help="compare the size of both --pdf-output layouts")
+    parser.add_argument("--optimize", action="store_true",
+                        help="write smaller section PDFs (unused resources removed, "
+                             "streams recompressed, object streams)")
+    parser.add_argument("--image-dpi", type=int,
+                        help="with --optimize, downsample images above this "
+                             "resolution (needs Pillow)")
+    parser.add_argument("--hash-assets", action="store_true",
+                        help="publish every asset under a content-hashed name, "
+                             "write output/asset-manifest.json and remove "
+                             "orphaned old hashes")
+    parser.add_argument("--production", action="store_true",
+                        help="minify the HTML, move the CSS to a fingerprinted "
+                             "stylesheet with critical rules inlined, and write "
+                             ".gz/.br copies of every HTML, CSS and PDF file")
+    parser.add_argument("--watch", action="store_true",
+                        help="after building, serve the guide with live reload "
+                             "and rebuild what changed whenever an input changes "
+                             "(implies --incremental)")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="port of the --watch preview server")
+    build_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    configure(documents.load(args.document), hash_assets=args.hash_assets)
+    # Watch mode rebuilds only what changed, including after a restart
+    args.incremental = args.incremental or args.watch
+    metrics = build_metrics.Metrics("build-html.py")
+    page_ranges, _ = run_build(args, metrics)
+    print(f"\nDone! Open in browser: {PUBLISH_DIR / GUIDE.name}")
+    build_metrics.finish(metrics, args)
+    if args.watch:
+        watch(args, page_ranges, port=args.port)
 
 
 if __name__ == "__main__":
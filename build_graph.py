@@ -0,0 +1,97 @@
+"""Content-hash dependency tracking for incremental builds.
+
+A manifest records, for every generated artifact, the digests of the inputs
+it was built from. An artifact is stale when it is missing or when any input
+digest differs from the recorded one; everything else is skipped.
+
+File digests are memoized in the manifest by (size, mtime), so a no-op
+rebuild only stats its inputs instead of re-reading them.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+def parallel_imap(fn, items, jobs=1, initializer=None, initargs=()):
+    """Lazily map fn over items on up to `jobs` worker processes.
+
+    Results are yielded in input order as soon as each is ready, so the
+    caller can consume the first while later ones are still running. fn must
+    be a module-level function and items picklable. With jobs <= 1
+    everything runs in the current process.
+
+    initializer(*initargs) runs once in each worker before any item. Workers
+    started with spawn or forkserver re-import fn's module instead of
+    inheriting its state, so fn must not rely on module globals set at run
+    time unless the initializer sets them again (e.g. a script's configure()).
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(items)),
+                             initializer=initializer, initargs=initargs) as pool:
+        yield from pool.map(fn, items)
+
+
+def parallel_map(fn, items, jobs=1, initializer=None, initargs=()):
+    """Like parallel_imap, but return all results as a list."""
+    return list(parallel_imap(fn, items, jobs, initializer, initargs))
+
+
+def sha256_file(path):
+    """SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sha256_text(text):
+    """SHA-256 hex digest of a string."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Manifest:
+    """Recorded input digests per artifact, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get("files", {})
+        self.artifacts = data.get("artifacts", {})
+
+    def file_digest(self, path):
+        """Digest of an input file, re-hashed only if its size or mtime changed."""
+        path = Path(path)
+        st = path.stat()
+        key = str(path.resolve())
+        entry = self.files.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        digest = sha256_file(path)
+        self.files[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def is_fresh(self, artifact, inputs):
+        """True if artifact exists and was built from exactly these inputs."""
+        artifact = Path(artifact)
+        return artifact.exists() and self.artifacts.get(str(artifact)) == inputs
+
+    def record(self, artifact, inputs):
+        """Remember the inputs an artifact was just built from."""
+        self.artifacts[str(Path(artifact))] = inputs
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"files": self.files, "artifacts": self.artifacts},
+                                  indent=1, sort_keys=True))
+        os.replace(tmp, self.path)
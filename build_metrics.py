@@ -0,0 +1,151 @@
+"""Per-stage timing and resource metrics for the build scripts.
+
+Wrap each stage in ``with metrics.stage("name"):`` and the stage's wall and
+CPU time, subprocess launches, bytes read and written, and peak RSS are
+recorded. report() returns the stages as a JSON-ready dict; print_table()
+shows the same numbers for --profile.
+
+CPU time includes reaped child processes (subprocesses and worker pools).
+Subprocess counts and I/O bytes cover the current process only: bytes come
+from /proc/self/io (rchar/wchar, so pipe reads count too) and are None where
+that file does not exist, e.g. on macOS.
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+_spawned = 0
+_popen_init = None
+
+
+def _count_subprocesses():
+    """Count every subprocess.Popen created in this process (idempotent)."""
+    global _popen_init
+    if _popen_init is not None:
+        return
+    _popen_init = subprocess.Popen.__init__
+
+    def counting_init(self, *args, **kwargs):
+        global _spawned
+        _spawned += 1
+        _popen_init(self, *args, **kwargs)
+
+    subprocess.Popen.__init__ = counting_init
+
+
+def _io_bytes():
+    """(bytes read, bytes written) by this process so far, or (None, None)."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _snapshot():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    read, written = _io_bytes()
+    return {
+        "wall": time.perf_counter(),
+        "cpu": own.ru_utime + own.ru_stime,
+        "child_cpu": children.ru_utime + children.ru_stime,
+        "subprocesses": _spawned,
+        "read": read,
+        "written": written,
+        "rss": own.ru_maxrss * _RSS_UNIT,
+        "child_rss": children.ru_maxrss * _RSS_UNIT,
+    }
+
+
+def _delta(after, before, key):
+    if after[key] is None or before[key] is None:
+        return None
+    return after[key] - before[key]
+
+
+class Metrics:
+    """Recorded stages of one build run."""
+
+    def __init__(self, script):
+        self.script = script
+        self.stages = []
+        _count_subprocesses()
+        self._start = _snapshot()
+
+    @contextmanager
+    def stage(self, name):
+        before = _snapshot()
+        try:
+            yield
+        finally:
+            after = _snapshot()
+            self.stages.append(self._entry(name, before, after))
+
+    def _entry(self, name, before, after):
+        return {
+            "stage": name,
+            "wall_s": round(after["wall"] - before["wall"], 6),
+            "cpu_s": round(after["cpu"] - before["cpu"], 6),
+            "child_cpu_s": round(after["child_cpu"] - before["child_cpu"], 6),
+            "subprocesses": after["subprocesses"] - before["subprocesses"],
+            "read_bytes": _delta(after, before, "read"),
+            "written_bytes": _delta(after, before, "written"),
+            # Peak RSS is a high-water mark: the process-wide peak so far
+            "peak_rss_bytes": after["rss"],
+            "child_peak_rss_bytes": after["child_rss"],
+        }
+
+    def report(self):
+        """All stages plus a whole-run total, as a JSON-serializable dict."""
+        return {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "stages": self.stages,
+            "total": self._entry("total", self._start, _snapshot()),
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+    def print_table(self):
+        report = self.report()
+
+        def mb(value):
+            return "-" if value is None else f"{value / (1 << 20):.1f}"
+
+        print(f"\n{'stage':<28}{'wall s':>9}{'cpu s':>9}{'child s':>9}{'procs':>7}"
+              f"{'read MB':>9}{'write MB':>9}{'peak MB':>9}")
+        for s in report["stages"] + [report["total"]]:
+            print(f"{s['stage']:<28}{s['wall_s']:>9.3f}{s['cpu_s']:>9.3f}"
+                  f"{s['child_cpu_s']:>9.3f}{s['subprocesses']:>7}"
+                  f"{mb(s['read_bytes']):>9}{mb(s['written_bytes']):>9}"
+                  f"{mb(s['peak_rss_bytes']):>9}")
+
+
+def add_arguments(parser):
+    """Add the shared --profile and --metrics-json options to a parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall/CPU time, subprocesses, I/O and peak "
+                             "memory per build stage")
+    parser.add_argument("--metrics-json", metavar="FILE",
+                        help="write the per-stage metrics as JSON to FILE")
+
+
+def finish(metrics, args):
+    """Emit the report requested on the command line, if any."""
+    if args.profile:
+        metrics.print_table()
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+        print(f"Metrics written to {args.metrics_json}")
@@ -0,0 +1,23 @@
+"""Import the hyphenated build scripts (build-html.py, clean-source-text.py)
+as modules, for the benchmarks and batch-build.py.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def load_script(name):
+    """Import one of the hyphenated build scripts as a module.
+
+    The module is registered in sys.modules (as build_html etc.) so that
+    worker processes can unpickle its functions. Each call re-executes the
+    script, giving a freshly configured module.
+    """
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), HERE / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
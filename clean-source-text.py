@@ -10,65 +10,54 @@ Works with different text layouts by detecting:
 - Section dividers (asterisk separators)
 - Page headers/footers
 - Hyphenated word breaks across lines/pages
+
+The document (PDF, section markers, output directory, page artifact
+patterns) comes from a manifest, documents/straussian-moment.json by
+default; pass --document FILE for another.
 """
 
+import argparse
 import re
-import subprocess
+from collections import deque
 from pathlib import Path
 
-ROOT = Path("/Users/kostasstankevicius/The-Straussian-Moment-Analysis")
-SOURCES = ROOT / "analyses" / "straussian-moment" / "source-sections"
-PDF = ROOT / "2007-thiel.pdf"
+import build_graph
+import build_metrics
+import documents
+import pdf_text
+import section_markers
 
 MIN_INDENT = 4  # Minimum spaces to count as "indented" (paragraph start or quote)
 
-# Section boundaries (headings as they appear in the layout text)
-SECTIONS = [
-    {
-        "num": 1,
-        "title": "Introduction / The Question of Human Nature",
-        "filename": "section-1-human-nature.md",
-        "start_marker": None,
-        "end_marker": "JOHN Locke: THE AMERICAN COMPROMISE",
-    },
-    {
-        "num": 2,
-        "title": "John Locke — The American Compromise",
-        "filename": "section-2-locke.md",
-        "start_marker": "JOHN Locke: THE AMERICAN COMPROMISE",
-        "end_marker": "CARL SCHMITT: THE PERSISTENCE OF THE POLITICAL",
-    },
-    {
-        "num": 3,
-        "title": "Carl Schmitt — The Persistence of the Political",
-        "filename": "section-3-schmitt.md",
-        "start_marker": "CARL SCHMITT: THE PERSISTENCE OF THE POLITICAL",
-        "end_marker": "LEO STRAUSS: PROCEED WITH CAUTION",
-    },
-    {
-        "num": 4,
-        "title": "Leo Strauss — Proceed with Caution",
-        "filename": "section-4-strauss.md",
-        "start_marker": "LEO STRAUSS: PROCEED WITH CAUTION",
-        "end_marker": "RENE GIRARD: THE END OF THE CITY OF MAN",
-    },
-    {
-        "num": 5,
-        "title": "René Girard — The End of the City of Man",
-        "filename": "section-5-girard.md",
-        "start_marker": "RENE GIRARD: THE END OF THE CITY OF MAN",
-        "end_marker": "NOTES",
-    },
-]
-
-
-def get_layout_text():
-    """Extract text from PDF with layout preservation."""
-    result = subprocess.run(
-        ["pdftotext", "-layout", str(PDF), "-"],
-        capture_output=True, text=True,
-    )
-    return result.stdout
+# Module-level paths, SECTIONS and document patterns come from a document
+# manifest (see documents.py) and are set by configure()
+DOCUMENT = ROOT = SOURCES = PDF = None
+SECTIONS = []
+
+
+def configure(doc):
+    """Point the module-level paths, SECTIONS and patterns at one loaded document."""
+    global DOCUMENT, ROOT, SOURCES, PDF, SECTIONS, ARTIFACT_RE, HEADING_NUMS, HEADING_RE
+    DOCUMENT = doc
+    ROOT = doc["root"]
+    SOURCES = doc["sources"]
+    PDF = doc["pdf"]
+    # Section boundaries (headings as they appear in the layout text)
+    SECTIONS = [
+        {"num": sec["num"], "title": sec["source_title"], "filename": sec["filename"],
+         "start_marker": sec["start_marker"], "end_marker": sec.get("end_marker")}
+        for sec in doc["sections"]
+    ]
+    ARTIFACT_RE = re.compile(doc["cleaner"]["artifact_pattern"])
+    HEADING_NUMS = {sec["start_marker"]: sec["num"] for sec in SECTIONS if sec["start_marker"]}
+    # (?!) never matches: a single-section document has no headings to find
+    HEADING_RE = re.compile('|'.join(re.escape(h) for h in HEADING_NUMS) or "(?!)")
+
+
+def get_layout_text(backend=pdf_text.DEFAULT_BACKEND, workers=1):
+    """Extract text from PDF with layout preservation (cached per PDF digest)."""
+    return pdf_text.join_pages(
+        pdf_text.get_pages(PDF, layout=True, backend=backend, workers=workers))
 
 
 def leading_spaces(line):
@@ -78,119 +67,165 @@ def leading_spaces(line):
     return len(line) - len(line.lstrip())
 
 
-def is_page_artifact(line):
-    """Check if a line is a page header, footer, or number."""
-    s = line.strip()
-    if not s:
-        return False
-    if re.match(r'^The Straussian Moment\s+\.?\s*\d+$', s):
-        return True
-    if re.match(r'^\d+\s+Peter Thiel$', s):
-        return True
-    if re.match(r'^\d{3}$', s):
-        return True
-    return False
+# ---------------------------------------------------------------------------
+# Line classification
+# ---------------------------------------------------------------------------
 
+# Line kinds assigned by classify_line
+BLANK = 'BLANK'
+ARTIFACT = 'ARTIFACT'      # page header, footer or number
+HEADING = 'HEADING'        # main section heading (already in the markdown title)
+DIVIDER = 'DIVIDER'        # section divider (* * *)
+SUBHEADING = 'SUBHEADING'  # internal centered ALL-CAPS heading
+BODY = 'BODY'
 
-def is_main_section_heading(line):
-    """Check if a line is one of the main section headings we already title.
+# Set by configure():
+# ARTIFACT_RE matches page headers/footers/numbers, all alternatives in one
+# pattern. HEADING_RE matches only the TOP-LEVEL section headings that
+# duplicate the markdown header (e.g., "JOHN Locke: THE AMERICAN COMPROMISE");
+# internal sub-headings like "THE QUESTION OF HUMAN NATURE" are kept as part
+# of the text. HEADING_NUMS maps each heading to its section number.
+ARTIFACT_RE = HEADING_RE = None
+HEADING_NUMS = {}
 
-    Only removes the TOP-LEVEL section headings that duplicate the markdown
-    header (e.g., "JOHN Locke: THE AMERICAN COMPROMISE"). Internal sub-headings
-    like "THE QUESTION OF HUMAN NATURE" are kept as part of the text.
-    """
-    s = line.strip()
-    if not s:
-        return False
-    # Only match the exact main section headings
-    main_headings = [
-        "JOHN Locke: THE AMERICAN COMPROMISE",
-        "CARL SCHMITT: THE PERSISTENCE OF THE POLITICAL",
-        "LEO STRAUSS: PROCEED WITH CAUTION",
-        "RENE GIRARD: THE END OF THE CITY OF MAN",
-    ]
-    for heading in main_headings:
-        if heading in s:
-            return True
-    return False
+DIVIDER_RE = re.compile(r'^[\s*kKOox.×]+$')
+
+configure(documents.load(documents.DEFAULT_MANIFEST))
 
 
-def is_subheading(line):
-    """Check if a line is an internal subheading (centered, ALL-CAPS).
+def is_subheading(s, indent):
+    """Check if a stripped line is an internal subheading (centered, ALL-CAPS).
 
     These are kept in the text but treated as paragraph boundaries.
     """
-    s = line.strip()
-    if not s or len(s) < 10:
+    if len(s) < 10 or indent < 10:
         return False
-    if leading_spaces(line) >= 10:
-        upper_ratio = sum(1 for c in s if c.isupper()) / max(len(s.replace(' ', '')), 1)
-        if upper_ratio > 0.5 and s not in ("NOTES",):
-            return True
-    return False
+    upper_ratio = sum(1 for c in s if c.isupper()) / max(len(s.replace(' ', '')), 1)
+    return upper_ratio > 0.5 and s != DOCUMENT["end_marker"]
+
 
+def classify_line(line):
+    """Tag a layout line once as (kind, indent, text).
 
-def is_divider(line):
-    """Check if a line is a section divider (* * *)."""
+    text is the stripped line; for BODY lines runs of spaces are collapsed.
+    """
     s = line.strip()
     if not s:
-        return False
-    if re.match(r'^[\s*kKOox.×]+$', s) and len(s) <= 20 and '*' in s:
+        return (BLANK, 0, '')
+    if ARTIFACT_RE.match(s):
+        return (ARTIFACT, 0, s)
+    if HEADING_RE.search(s):
+        return (HEADING, 0, s)
+    if len(s) <= 20 and '*' in s and DIVIDER_RE.match(s):
+        return (DIVIDER, 0, s)
+    indent = len(line) - len(line.lstrip())
+    if is_subheading(s, indent):
+        return (SUBHEADING, indent, s)
+    return (BODY, indent, normalize_spaces(s))
+
+
+def heading_candidate(kind, s):
+    """Could a classified line be a section heading that did not match exactly?
+
+    Only subheadings and short, mostly upper-case body lines are worth
+    indexing for the fuzzy fallback.
+    """
+    if kind == SUBHEADING:
         return True
-    return False
+    # Body text mostly starts lower-case mid-sentence: reject it cheaply
+    if kind != BODY or len(s) > 80 or s[0].islower():
+        return False
+    return sum(map(str.isupper, s)) > sum(map(str.islower, s))
+
+
+def poem_role(line, s):
+    """Classify a non-blank line ahead of the body text for the opening poem.
+
+    Returns 'attribution' for the line naming the poem's source (the
+    document's epigraph_end, e.g. "Locksley Hall"), 'verse' for an indented
+    poem line, or None for title-page text and anything else.
+    """
+    cleaner = DOCUMENT["cleaner"]
+    # The raw line: title-page entries keep the layout's runs of spaces
+    if any(text in line for text in cleaner["title_page"]):
+        return None
+    if cleaner["epigraph_end"] and cleaner["epigraph_end"] in s:
+        return 'attribution'
+    if leading_spaces(line) >= 8:
+        return 'verse'
+    return None
 
 
 def clean_and_split_sections(layout_text):
-    """Parse layout text, find section boundaries."""
-    all_lines = layout_text.split('\n')
+    """Parse layout text, find section boundaries.
 
+    Makes a single pass over the lines, classifying each one and picking up
+    section starts, the NOTES heading and the opening poem along the way.
+    Returns the classified lines for extract_clean_lines to consume.
+    """
+    first = SECTIONS[0]["num"]
+    lines = []
     section_starts = {}
-    for i, line in enumerate(all_lines):
-        s = line.strip()
-        for sec in SECTIONS:
-            if sec["start_marker"] and sec["start_marker"] in s:
-                section_starts[sec["num"]] = i
+    notes_start = None
+    poem_candidates = []
+    poem_done = False
+
+    for i, line in enumerate(layout_text.split('\n')):
+        tag = classify_line(line)
+        lines.append(tag)
+        kind, _, s = tag
+        if kind == BLANK:
+            continue
 
-    # Section 1 starts at the first body text line
-    for i, line in enumerate(all_lines):
-        if 'twenty-first century started' in line:
-            section_starts[1] = i
-            break
+        # Main section headings mark their section's start (last occurrence)
+        if kind == HEADING:
+            for m in HEADING_RE.finditer(s):
+                section_starts[HEADING_NUMS[m.group()]] = i
 
-    # Find NOTES section
-    notes_start = None
-    for i, line in enumerate(all_lines):
-        if line.strip() == 'NOTES':
+        # The first section starts at the first body text line
+        if first not in section_starts and DOCUMENT["body_marker"] in line:
+            section_starts[first] = i
+
+        if notes_start is None and s == DOCUMENT["end_marker"]:
             notes_start = i
-            break
+
+        # Capture the poem (before the first section's body)
+        if not poem_done:
+            role = poem_role(line, s)
+            if role == 'attribution':
+                poem_candidates.append((-1, line))
+                poem_done = True
+            elif role == 'verse':
+                poem_candidates.append((i, line))
+
+    # Headings with no exact match (OCR glitches, other editions): take the
+    # most similar line, and drop it from the text like an exact heading
+    missing = [sec for sec in SECTIONS if sec["start_marker"] and sec["num"] not in section_starts]
+    if missing:
+        # Only lines that could be headings are indexed, one chunk each
+        candidates = [i for i, (kind, _, s) in enumerate(lines) if heading_candidate(kind, s)]
+        index = section_markers.FuzzyMarkerIndex(lines[i][2] for i in candidates)
+        for sec in missing:
+            match = index.best_match(sec["start_marker"])
+            if match and match.confidence >= section_markers.MIN_MARKER_CONFIDENCE:
+                i = candidates[match.chunk]
+                section_starts[sec["num"]] = i
+                lines[i] = (HEADING, 0, lines[i][2])
+
+    body_start = section_starts.get(first, 999)
+    poem_lines = [line for i, line in poem_candidates if i < body_start]
 
     section_ranges = {}
-    for sec in SECTIONS:
+    for k, sec in enumerate(SECTIONS):
         num = sec["num"]
         start = section_starts.get(num, 0)
-        if num < 5:
-            end = section_starts.get(num + 1, notes_start or len(all_lines))
+        if k + 1 < len(SECTIONS):
+            end = section_starts.get(SECTIONS[k + 1]["num"], notes_start or len(lines))
         else:
-            end = notes_start or len(all_lines)
+            end = notes_start or len(lines)
         section_ranges[num] = (start, end)
 
-    # Capture the poem (before section 1 body)
-    poem_lines = []
-    for i, line in enumerate(all_lines):
-        s = line.strip()
-        if not s:
-            continue
-        if 'The         Straussian Moment' in line or 'Peter Thiel' in s:
-            continue
-        if 'President, Clarium' in s:
-            continue
-        if 'Locksley Hall' in s:
-            poem_lines.append(line)
-            break
-        if i < section_starts.get(1, 999) and leading_spaces(line) >= 8:
-            poem_lines.append(line)
-
-    return section_ranges, all_lines, poem_lines
+    return section_ranges, lines, poem_lines
 
 
 def normalize_spaces(text):
@@ -198,38 +233,40 @@ def normalize_spaces(text):
     return re.sub(r'  +', ' ', text)
 
 
-def extract_clean_lines(all_lines, start, end):
-    """Extract content lines for a section, removing artifacts.
+def iter_clean_items(tags):
+    """Turn a section's classified lines into content items, lazily.
 
-    Returns list of (indent, text) tuples for non-blank content lines,
-    with 'BLANK' markers where blank lines existed in the original.
-    Special types: 'DIVIDER' for section dividers, 'SUBHEADING' for internal headings.
+    Consumes the (kind, indent, text) tags from classify_line and yields
+    (indent, text) tuples for non-blank content lines, with 'BLANK' markers
+    where blank lines existed in the original (runs collapsed, none at the
+    start or end). Special types: 'DIVIDER' for section dividers,
+    'SUBHEADING' for internal headings.
     """
-    result = []
+    emitted = False
+    pending_blank = False  # Only emitted once more content follows
     in_drop_cap = True  # At start of section, handle drop-cap region
 
-    for i in range(start, end):
-        line = all_lines[i]
-        if is_page_artifact(line):
-            continue
-        if is_main_section_heading(line):
+    for kind, indent, text in tags:
+        if kind == ARTIFACT or kind == HEADING:
             continue
-        if not line.strip():
-            if result and result[-1] != 'BLANK':
-                result.append('BLANK')
+        if kind == BLANK:
+            pending_blank = emitted
             continue
-        if is_divider(line):
-            result.append(('DIVIDER', line.strip()))
+        if pending_blank:
+            yield 'BLANK'
+            pending_blank = False
+
+        if kind == DIVIDER:
+            yield ('DIVIDER', text)
+            emitted = True
             in_drop_cap = False
             continue
-        if is_subheading(line):
-            result.append(('SUBHEADING', line.strip()))
+        if kind == SUBHEADING:
+            yield ('SUBHEADING', text)
+            emitted = True
             in_drop_cap = False
             continue
 
-        indent = leading_spaces(line)
-        text = normalize_spaces(line.strip())
-
         # Handle drop-cap region: at the start of a section, the first
         # paragraph may have extra indentation from a large initial letter.
         # All lines in this region (until the first non-indented line) should
@@ -242,7 +279,7 @@ def extract_clean_lines(all_lines, start, end):
 
         # Fix drop-cap artifacts: the large initial letter is often lost
         # in extraction, leaving e.g. "he" instead of "The"
-        if in_drop_cap and indent == 0 and not result:
+        if in_drop_cap and indent == 0 and not emitted:
             # This is the very first content line. Check for missing drop cap.
             # Common pattern: first word is lowercase but should start uppercase
             if text and text[0].islower():
@@ -250,186 +287,179 @@ def extract_clean_lines(all_lines, start, end):
                 if text.startswith('he ') or text.startswith('he\xa0'):
                     text = 'T' + text
 
-        result.append((indent, text))
+        yield (indent, text)
+        emitted = True
 
 
-    # Strip leading/trailing blanks
-    while result and result[0] == 'BLANK':
-        result.pop(0)
-    while result and result[-1] == 'BLANK':
-        result.pop()
+def extract_clean_lines(lines, start, end):
+    """Extract content lines for a section, removing artifacts (as a list)."""
+    return list(iter_clean_items(lines[start:end]))
 
-    return result
 
+def is_indented(item):
+    """True for a text line with at least MIN_INDENT spaces."""
+    return item is not None and not isinstance(item[0], str) and item[0] >= MIN_INDENT
 
-def join_with_hyphens(text_a, text_b):
-    """Join two text fragments, handling hyphenated word breaks."""
-    if not text_a:
-        return text_b
-    if not text_b:
-        return text_a
-    # Hyphenated break: text_a ends with letter-hyphen, text_b starts lowercase
-    if (text_a[-1] == '-' and len(text_a) >= 2 and text_a[-2].isalpha()
-            and not text_a.endswith('--') and text_b[0].islower()):
-        return text_a[:-1] + text_b
-    return text_a + ' ' + text_b
 
+class Lookahead:
+    """Iterator over content items that can peek past BLANK markers.
 
-def process_section(all_lines, start, end):
-    """Process section lines into clean markdown text.
+    Blank runs are already collapsed, so peeking at the next one or two
+    content items buffers at most a handful of items: the assembler runs in
+    constant memory on a stream.
+    """
+
+    def __init__(self, items):
+        self._items = iter(items)
+        self._buffer = deque()
+
+    def _fill(self, n):
+        while len(self._buffer) < n:
+            item = next(self._items, None)
+            if item is None:
+                return False
+            self._buffer.append(item)
+        return True
+
+    def peek(self):
+        """The next item, or None at the end."""
+        return self._buffer[0] if self._fill(1) else None
+
+    def next(self):
+        """Consume and return the next item, or None at the end."""
+        return self._buffer.popleft() if self._fill(1) else None
+
+    def peek_content(self, nth=1):
+        """The nth non-blank item from the current position, or None."""
+        seen = 0
+        k = 0
+        while self._fill(k + 1):
+            if self._buffer[k] != 'BLANK':
+                seen += 1
+                if seen == nth:
+                    return self._buffer[k]
+            k += 1
+        return None
+
+    def skip_blanks(self):
+        while self.peek() == 'BLANK':
+            self.next()
+
+
+def assemble(items):
+    """Group content items into ('para'|'quote'|'divider'|'subheading', text).
 
     Uses indentation as the primary signal for structure:
     - Lines with >= MIN_INDENT spaces: start of new paragraph or block quote
     - Lines with < MIN_INDENT spaces: continuation of current element
     - Consecutive indented lines (across blank lines): block quote
     - Single indented line followed by unindented: paragraph start
-    """
-    items = extract_clean_lines(all_lines, start, end)
 
-    # Build elements: list of ('para', text) | ('quote', text) | ('divider', text)
-    elements = []
-    i = 0
+    Works as a generator with bounded lookahead, so elements come out as
+    soon as they are complete.
+    """
+    ahead = Lookahead(items)
 
-    while i < len(items):
-        item = items[i]
+    while True:
+        item = ahead.next()
+        if item is None:
+            break
 
         # Skip blank markers
         if item == 'BLANK':
-            i += 1
             continue
 
         # Handle dividers
         if item[0] == 'DIVIDER':
-            elements.append(('divider', '\u2042'))
-            i += 1
+            yield ('divider', '\u2042')
             continue
 
         # Handle subheadings
         if item[0] == 'SUBHEADING':
-            elements.append(('subheading', item[1]))
-            i += 1
+            yield ('subheading', item[1])
             continue
 
         indent, text = item
 
-        if indent >= MIN_INDENT:
-            # Indented line. Determine: block quote or paragraph start?
-            # Look ahead (past blanks) to see if the NEXT content line
-            # is also indented or not.
-            is_quote = is_quote_block(items, i)
-
-            if is_quote:
-                # Collect all lines of this quote block
-                quote_text, i = collect_quote(items, i)
-                elements.append(('quote', quote_text))
-            else:
-                # This is a paragraph start (indented first line).
-                # Collect this line + all following unindented continuation lines.
-                para_text, i = collect_paragraph(items, i)
-                elements.append(('para', para_text))
+        if indent >= MIN_INDENT and is_quote_block(ahead):
+            # Indented line followed (past blanks) by another indented line:
+            # collect all lines of this quote block
+            yield ('quote', collect_quote(text, ahead))
         else:
-            # Unindented line at the start of a section or after a divider/quote.
-            # Treat as a paragraph.
-            para_text, i = collect_paragraph(items, i)
-            elements.append(('para', para_text))
-
-    # Format output
-    parts = []
-    for etype, etext in elements:
-        if etype == 'divider':
-            parts.append('\u2042')
-        elif etype == 'quote':
-            parts.append(f'> {etext}')
-        elif etype == 'subheading':
-            parts.append(etext)
-        else:
-            parts.append(etext)
+            # Paragraph start (indented first line), or an unindented line at
+            # the start of a section or after a divider/quote. Collect this
+            # line + all following unindented continuation lines.
+            yield ('para', collect_paragraph(text, ahead))
+
+
+def format_element(element):
+    """Render one assembled element as markdown."""
+    etype, etext = element
+    if etype == 'divider':
+        return '\u2042'
+    if etype == 'quote':
+        return f'> {etext}'
+    return etext
+
 
-    return '\n\n'.join(parts)
+def process_section(lines, start, end):
+    """Process section lines into clean markdown text."""
+    elements = assemble(iter_clean_items(lines[start:end]))
+    return '\n\n'.join(format_element(e) for e in elements)
 
 
-def is_quote_block(items, start_idx):
-    """Determine if the indented line at start_idx begins a block quote.
+def is_quote_block(ahead):
+    """Determine if the indented line just consumed begins a block quote.
 
     A block quote has multiple consecutive indented lines (possibly separated
     by blank lines from page breaks). A paragraph start is a single indented
     line followed by unindented continuation.
 
-    Heuristic: look at the next 2-3 non-blank lines after start_idx.
-    If at least 2 of them are also indented, it's a quote.
+    Heuristic: if the first non-blank item after it is also an indented
+    text line, it's a quote.
     """
-    indented_count = 0
-    unindented_count = 0
-    checked = 0
-
-    j = start_idx + 1
-    while j < len(items) and checked < 4:
-        if items[j] == 'BLANK':
-            j += 1
-            continue
-        if isinstance(items[j][0], str):  # DIVIDER, SUBHEADING, etc.
-            break
-        indent, text = items[j]
-        if indent >= MIN_INDENT:
-            indented_count += 1
-        else:
-            unindented_count += 1
-        checked += 1
-        j += 1
+    return is_indented(ahead.peek_content())
 
-    # If the next non-blank lines are mostly indented, it's a quote
-    # If the very next non-blank line is unindented, it's a paragraph start
-    if checked == 0:
-        return False
-    # If first non-blank successor is indented, likely a quote
-    j = start_idx + 1
-    while j < len(items) and items[j] == 'BLANK':
-        j += 1
-    if (j < len(items) and items[j] != 'BLANK'
-            and not isinstance(items[j][0], str)
-            and items[j][0] >= MIN_INDENT):
-        return True
-    return False
 
+def ends_with_hyphen_break(text):
+    """True if text ends in a single hyphen (a word broken across lines)."""
+    return text.endswith('-') and not text.endswith('--')
 
-def collect_quote(items, start_idx):
-    """Collect a block quote starting at start_idx.
+
+def collect_quote(first_text, ahead):
+    """Collect a block quote whose first line has just been consumed.
 
     Gathers consecutive indented lines (allowing blank lines from page breaks
     and occasional unindented continuation after hyphenation).
     Stops when we hit a non-indented line that doesn't continue a hyphen,
     or a divider.
     """
-    parts = []
-    i = start_idx
+    parts = [first_text]
 
-    while i < len(items):
-        item = items[i]
+    while True:
+        item = ahead.peek()
+        if item is None:
+            break
 
         if item == 'BLANK':
             # Blank line in a quote: check if the quote continues
-            j = i + 1
-            while j < len(items) and items[j] == 'BLANK':
-                j += 1
-            if (j < len(items) and items[j] != 'BLANK'
-                    and not isinstance(items[j][0], str)):
-                next_indent = items[j][0]
-                # If next content line is indented, check whether it's
-                # a continuation of THIS quote or the start of a NEW paragraph.
-                # Use is_quote_block to check: if the line after j is also
-                # indented, the quote continues. If non-indented, j starts
-                # a new paragraph (its indentation is paragraph indent, not quote).
-                if next_indent >= MIN_INDENT and is_quote_block(items, j):
-                    i = j
-                    continue
-                # If next line is unindented but previous ended with hyphen, continue
-                if parts and parts[-1].endswith('-') and not parts[-1].endswith('--'):
-                    i = j
-                    continue
-                # Otherwise, quote is done
-                break
-            else:
+            next_item = ahead.peek_content()
+            if next_item is None or isinstance(next_item[0], str):
                 break
+            # If next content line is indented, check whether it's
+            # a continuation of THIS quote or the start of a NEW paragraph:
+            # if the line after it is also indented, the quote continues.
+            # If non-indented, it starts a new paragraph (its indentation
+            # is paragraph indent, not quote).
+            if is_indented(next_item) and is_indented(ahead.peek_content(2)):
+                ahead.skip_blanks()
+                continue
+            # If next line is unindented but previous ended with hyphen, continue
+            if ends_with_hyphen_break(parts[-1]):
+                ahead.skip_blanks()
+                continue
+            # Otherwise, quote is done
+            break
 
         if isinstance(item[0], str):
             # DIVIDER, SUBHEADING, etc.
@@ -439,87 +469,87 @@ def collect_quote(items, start_idx):
 
         if indent >= MIN_INDENT:
             parts.append(text)
-            i += 1
-        elif parts and parts[-1].endswith('-') and not parts[-1].endswith('--') and text and text[0].islower():
+        elif ends_with_hyphen_break(parts[-1]) and text and text[0].islower():
             # Unindented continuation after hyphenation within a quote
             parts.append(text)
-            i += 1
         else:
             # Unindented line that's not a hyphen continuation: quote is done
             break
+        ahead.next()
 
-    # Join all parts
-    quote_text = join_parts(parts)
-    return quote_text, i
+    return join_parts(parts)
 
 
-def collect_paragraph(items, start_idx):
-    """Collect a paragraph starting at start_idx.
+def collect_paragraph(first_text, ahead):
+    """Collect a paragraph whose first line has just been consumed.
 
-    Gathers the starting line and all following unindented continuation lines
-    (allowing blank lines from page breaks). Stops at the next indented line
-    (which starts a new paragraph or quote) or a divider.
+    Gathers all following unindented continuation lines (allowing blank
+    lines from page breaks). Stops at the next indented line (which starts
+    a new paragraph or quote) or a divider.
     """
-    parts = []
-    i = start_idx
-
-    # Add the first line
-    if items[i] != 'BLANK' and items[i][0] not in ('DIVIDER', 'SUBHEADING'):
-        parts.append(items[i][1])
-        i += 1
+    parts = [first_text]
 
-    while i < len(items):
-        item = items[i]
+    while True:
+        item = ahead.peek()
+        if item is None:
+            break
 
         if item == 'BLANK':
             # Blank line: check what follows
-            j = i + 1
-            while j < len(items) and items[j] == 'BLANK':
-                j += 1
-            if j >= len(items):
-                break
-            next_item = items[j]
-            if next_item == 'BLANK':
+            next_item = ahead.peek_content()
+            if next_item is None or isinstance(next_item[0], str):
+                # End of section, or DIVIDER, SUBHEADING, etc.
                 break
-            if isinstance(next_item[0], str):
-                # DIVIDER, SUBHEADING, etc. - end of paragraph
-                break
-            next_indent = next_item[0]
-            if next_indent >= MIN_INDENT:
+            if next_item[0] >= MIN_INDENT:
                 # Next content is indented: new paragraph or quote. Stop here.
                 break
-            else:
-                # Next content is unindented: continuation after page break.
-                # Skip the blanks and continue collecting.
-                i = j
-                continue
+            # Next content is unindented: continuation after page break.
+            # Skip the blanks and continue collecting.
+            ahead.skip_blanks()
+            continue
 
         if isinstance(item[0], str):
             # DIVIDER, SUBHEADING, etc.
             break
 
-        indent, text = item
-
-        if indent >= MIN_INDENT:
+        if item[0] >= MIN_INDENT:
             # New indented line: start of new paragraph or quote. Stop.
             break
-        else:
-            # Unindented continuation line
-            parts.append(text)
-            i += 1
 
-    para_text = join_parts(parts)
-    return para_text, i
+        # Unindented continuation line
+        parts.append(item[1])
+        ahead.next()
+
+    return join_parts(parts)
 
 
 def join_parts(parts):
-    """Join text parts, handling hyphenated word breaks."""
-    if not parts:
-        return ''
-    result = parts[0]
-    for part in parts[1:]:
-        result = join_with_hyphens(result, part)
-    return result
+    """Join text parts, handling hyphenated word breaks.
+
+    A break is hyphenated when the text so far ends with letter-hyphen (but
+    not '--') and the next part starts lowercase; the hyphen is dropped and
+    the parts run together. Pieces are collected in a list and joined once,
+    tracking only the last two characters of the text so far, so long
+    paragraphs and quotes join in linear time.
+    """
+    pieces = []
+    tail = ''  # Last two characters of the joined text so far
+    for part in parts:
+        if not part:
+            continue
+        if not pieces:
+            pieces.append(part)
+        elif (tail[-1] == '-' and len(tail) == 2 and tail[0].isalpha()
+                and part[0].islower()):
+            pieces[-1] = pieces[-1][:-1]
+            pieces.append(part)
+            tail = tail[:-1]
+        else:
+            pieces.append(' ')
+            pieces.append(part)
+            tail = ' '
+        tail = (tail + part)[-2:]
+    return ''.join(pieces)
 
 
 def clean_poem(poem_lines):
@@ -528,34 +558,165 @@ def clean_poem(poem_lines):
     return '\n'.join(f'> {l}' for l in lines)
 
 
-def main():
+def write_section(sec, elements, poem_lines=None):
+    """Write a section's markdown file, element by element as they arrive."""
+    outpath = SOURCES / sec["filename"]
+    with open(outpath, 'w') as f:
+        f.write(f"# Section {sec['num']}: {sec['title']}\n\n")
+        # For the first section, prepend the poem
+        if poem_lines is not None:
+            f.write(clean_poem(poem_lines) + '\n\n')
+        for k, element in enumerate(elements):
+            if k:
+                f.write('\n\n')
+            f.write(format_element(element))
+        f.write('\n')
+    return outpath
+
+
+def clean_section(job):
+    """Assemble and write one section from its classified lines."""
+    sec, tags, poem_lines = job
+    return write_section(sec, assemble(iter_clean_items(tags)), poem_lines)
+
+
+# ---------------------------------------------------------------------------
+# Streaming mode
+# ---------------------------------------------------------------------------
+
+def read_front_matter(layout_lines):
+    """Consume lines up to the first body line.
+
+    Returns (poem_lines, first_body_line); first_body_line is None if the
+    body anchor never appears.
+    """
+    poem_lines = []
+    poem_done = False
+    for line in layout_lines:
+        if DOCUMENT["body_marker"] in line:
+            return poem_lines, line
+        s = line.strip()
+        if not s or poem_done:
+            continue
+        role = poem_role(line, s)
+        if role:
+            poem_lines.append(line)
+            poem_done = role == 'attribution'
+    return poem_lines, None
+
+
+def iter_sections(layout_lines, first_line):
+    """Yield (num, tags) for each section as its lines stream in.
+
+    tags lazily classifies the section's lines and stops at the next main
+    section heading or the NOTES heading, so each section is complete as
+    soon as its end marker has been read. Sections are expected in document
+    order; each tags iterator is drained before the next section starts.
+    """
+    layout_lines = iter(layout_lines)
+    upcoming = [(SECTIONS[0]["num"], first_line)]
+
+    def section_tags(first):
+        yield classify_line(first)
+        for line in layout_lines:
+            tag = classify_line(line)
+            kind, _, s = tag
+            if kind == HEADING:
+                upcoming.append((HEADING_NUMS[HEADING_RE.search(s).group()], line))
+                return
+            if s == DOCUMENT["end_marker"]:
+                return
+            yield tag
+
+    while upcoming:
+        num, first = upcoming.pop()
+        tags = section_tags(first)
+        yield num, tags
+        for _ in tags:
+            pass
+
+
+def stream_sections(backend=pdf_text.DEFAULT_BACKEND):
+    """Clean and write every section straight from pdftotext's output stream.
+
+    Only the current page, a few lookahead lines and the paragraph being
+    assembled are held in memory. Reads the extractor directly, bypassing
+    the text cache.
+    """
+    clean_stream(pdf_text.iter_lines(PDF, layout=True, backend=backend))
+
+
+def clean_stream(layout_lines):
+    """Clean and write every section from an iterator over layout lines."""
+    layout_lines = iter(layout_lines)
+    poem_lines, first_line = read_front_matter(layout_lines)
+    if first_line is None:
+        print("  Body text not found.")
+        return
+
+    by_num = {sec["num"]: sec for sec in SECTIONS}
+    for num, tags in iter_sections(layout_lines, first_line):
+        sec = by_num[num]
+        print(f"Processing Section {num}: {sec['title']} (streaming)...")
+        elements = assemble(iter_clean_items(tags))
+        outpath = write_section(sec, elements, poem_lines if sec is SECTIONS[0] else None)
+        print(f"  Written to: {outpath}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document", type=Path, default=documents.DEFAULT_MANIFEST,
+                        help="document manifest to clean")
+    parser.add_argument("--backend", choices=sorted(pdf_text.BACKENDS),
+                        default=pdf_text.DEFAULT_BACKEND,
+                        help="PDF text extraction backend")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="extract page chunks on N worker processes")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="process sections on N worker processes")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream pdftotext output and write each section as "
+                             "soon as it ends (bounded memory, no cache)")
+    build_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    configure(documents.load(args.document))
+    metrics = build_metrics.Metrics("clean-source-text.py")
+
+    if args.stream:
+        print("Streaming text with layout preservation...")
+        with metrics.stage("stream_sections"):
+            stream_sections(backend=args.backend)
+        print("\nDone! Source sections cleaned.")
+        build_metrics.finish(metrics, args)
+        return
+
     print("Extracting text with layout preservation...")
-    layout_text = get_layout_text()
+    with metrics.stage("get_layout_text"):
+        layout_text = get_layout_text(backend=args.backend, workers=args.workers)
 
     print("Parsing sections...")
-    section_ranges, all_lines, poem_lines = clean_and_split_sections(layout_text)
+    with metrics.stage("clean_and_split_sections"):
+        section_ranges, lines, poem_lines = clean_and_split_sections(layout_text)
 
+    jobs = []
     for sec in SECTIONS:
         num = sec["num"]
         start, end = section_ranges[num]
         print(f"Processing Section {num}: {sec['title']} (lines {start}-{end})...")
+        jobs.append((sec, lines[start:end], poem_lines if sec is SECTIONS[0] else None))
 
-        clean_text = process_section(all_lines, start, end)
-
-        # For section 1, prepend the poem
-        if num == 1:
-            poem_md = clean_poem(poem_lines)
-            clean_text = poem_md + '\n\n' + clean_text
-
-        # Build markdown file
-        header = f"# Section {num}: {sec['title']}\n\n"
-        output = header + clean_text + '\n'
-
-        outpath = SOURCES / sec["filename"]
-        outpath.write_text(output)
+    # Results arrive lazily and in order: with --jobs 1 each stage is exactly
+    # one section's work, otherwise the wait for that section's worker.
+    # Workers may re-import this module (spawn): point them at this document
+    results = build_graph.parallel_imap(clean_section, jobs, args.jobs,
+                                        configure, (DOCUMENT,))
+    for sec in SECTIONS:
+        with metrics.stage(f"process_section[{sec['num']}]"):
+            outpath = next(results)
         print(f"  Written to: {outpath}")
 
     print("\nDone! Source sections cleaned.")
+    build_metrics.finish(metrics, args)
 
 
 if __name__ == "__main__":
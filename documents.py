@@ -0,0 +1,99 @@
+"""Document manifests: what the build scripts need to know about one text.
+
+A document manifest is a JSON file:
+
+    {
+      "name": "straussian-moment",          # cache and log name
+      "title": "...", "subtitle": "...",    # study guide header
+      "text_label": "Thiel's actual essay", # how the guide refers to the text
+      "root": "..",                         # relative to the manifest file
+      "pdf": "2007-thiel.pdf",              # the rest relative to root
+      "analyses": "analyses/straussian-moment",
+      "sources": "analyses/straussian-moment/source-sections",
+      "output": "output",
+      "body_marker": "...",                 # first line of body text
+      "end_marker": "NOTES",                # heading that ends the text
+      "cleaner": {"artifact_pattern": "...", "title_page": [...],
+                  "epigraph_end": "..."},
+      "sections": [{"num", "title", "source_title", "filename",
+                    "start_marker", "end_marker",
+                    "analysis", "analysis_type": "main" | "standalone"}, ...]
+    }
+
+Section "analysis" files are relative to "analyses". A "main" analysis is
+a pass file covering several sections, each under a "## Section N"
+heading; a "standalone" one covers only its own section. A library manifest,
+{"documents": ["a.json", ...]}, lists document manifests for batch builds.
+"""
+
+import json
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_MANIFEST = HERE / "documents" / "straussian-moment.json"
+
+REQUIRED = ("name", "title", "pdf", "analyses", "sources", "output",
+            "body_marker", "end_marker", "sections")
+SECTION_REQUIRED = ("num", "title", "filename", "start_marker", "analysis")
+
+
+class ManifestError(ValueError):
+    """A document manifest is missing something or cannot be read."""
+
+
+def load(path):
+    """Read a document manifest and resolve its paths.
+
+    Returns a dict with the manifest's fields; root, pdf, analyses, sources
+    and output become absolute Paths, and every section gains absolute
+    "analysis" and "source" (its cleaned text file) paths.
+    """
+    path = Path(path).resolve()
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"{path}: {e}") from e
+
+    missing = [key for key in REQUIRED if key not in data]
+    if missing:
+        raise ManifestError(f"{path}: missing {', '.join(missing)}")
+
+    doc = dict(data, manifest=path)
+    doc["root"] = root = (path.parent / data.get("root", ".")).resolve()
+    for key in ("pdf", "analyses", "sources", "output"):
+        doc[key] = root / data[key]
+    doc.setdefault("subtitle", "")
+    doc.setdefault("text_label", "the original text")
+    doc["cleaner"] = dict({"artifact_pattern": r"^\d{1,3}$", "title_page": [],
+                           "epigraph_end": None}, **data.get("cleaner", {}))
+
+    doc["sections"] = []
+    for sec in data["sections"]:
+        missing = [key for key in SECTION_REQUIRED if key not in sec]
+        if missing:
+            raise ManifestError(f"{path}: section {sec.get('num', '?')} missing "
+                                f"{', '.join(missing)}")
+        doc["sections"].append(dict(
+            sec,
+            source_title=sec.get("source_title", sec["title"]),
+            analysis=doc["analyses"] / sec["analysis"],
+            analysis_type=sec.get("analysis_type", "standalone"),
+            source=doc["sources"] / sec["filename"],
+        ))
+    return doc
+
+
+def manifest_paths(path):
+    """Document manifest paths named by a manifest file.
+
+    A library manifest expands to the documents it lists (relative to
+    itself); a document manifest is returned as is.
+    """
+    path = Path(path).resolve()
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"{path}: {e}") from e
+    if isinstance(data, dict) and "documents" in data:
+        return [(path.parent / p).resolve() for p in data["documents"]]
+    return [path]
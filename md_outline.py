@@ -0,0 +1,98 @@
+"""Heading outline index for markdown analysis files.
+
+An Outline parses a document once into its ATX headings (level, title and
+character offsets), indexed by title and by label, i.e. the part of the
+title before its first colon ("Section 2" for "Section 2: John Locke").
+Any section or part can then be looked up and sliced without rescanning the
+text, however many sections and passes the file covers.
+"""
+
+import bisect
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+HEADING_RE = re.compile(r"(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$")
+FENCE_RE = re.compile(r"(```|~~~)")
+
+
+class Heading(NamedTuple):
+    level: int
+    title: str
+    start: int  # offset of the heading line
+    body: int   # offset just after the heading line
+    end: int    # offset of the next heading at the same or a higher level
+
+
+class Outline:
+    """Headings of one markdown document, indexed for direct lookup."""
+
+    def __init__(self, text):
+        self.text = text
+        self.headings = []
+        self._index = {}
+
+        offset = 0
+        fence = None
+        open_levels = []  # indices of headings whose end is not yet known
+        for line in text.splitlines(keepends=True):
+            stripped = line.strip()
+            marker = FENCE_RE.match(stripped)
+            if marker and (fence is None or marker.group(1) == fence):
+                fence = None if fence else marker.group(1)
+            elif fence is None:
+                m = HEADING_RE.match(line.rstrip("\r\n"))
+                if m:
+                    level = len(m.group(1))
+                    while open_levels and self.headings[open_levels[-1]].level >= level:
+                        closed = open_levels.pop()
+                        self.headings[closed] = self.headings[closed]._replace(end=offset)
+                    self.headings.append(Heading(level, m.group(2), offset,
+                                                 offset + len(line), len(text)))
+                    open_levels.append(len(self.headings) - 1)
+            offset += len(line)
+
+        for i, heading in enumerate(self.headings):
+            keys = {heading.title, heading.title.split(":", 1)[0].strip()}
+            for key in keys:
+                self._index.setdefault(key, []).append(i)
+        self._starts = [h.start for h in self.headings]
+
+    def find(self, name, level=None, within=None):
+        """First heading titled or labelled name, optionally at a given level
+        and inside another heading's span. Returns None if there is none.
+        """
+        candidates = self._index.get(name, ())
+        if within is not None:
+            # Candidates are in document order: skip those before `within`
+            first = bisect.bisect_left(self._starts, within.start)
+            candidates = candidates[bisect.bisect_left(candidates, first):]
+        for i in candidates:
+            heading = self.headings[i]
+            if within is not None and heading.start >= within.end:
+                break
+            if level is None or heading.level == level:
+                return heading
+        return None
+
+    def slice(self, heading):
+        """Text of a heading and everything under it."""
+        return self.text[heading.start:heading.end]
+
+    def between(self, first, last=None):
+        """Text from one heading up to (not including) another, or to the end."""
+        return self.text[first.start:last.start if last else len(self.text)]
+
+
+_outlines = {}
+
+
+def load_outline(path):
+    """Parse a markdown file once per process (re-parsed if it changes)."""
+    path = Path(path)
+    st = path.stat()
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _outlines.get(str(path))
+    if cached is None or cached[0] != stamp:
+        cached = _outlines[str(path)] = (stamp, Outline(path.read_text()))
+    return cached[1]
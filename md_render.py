@@ -0,0 +1,99 @@
+"""Memoized markdown-to-HTML rendering.
+
+markdown.markdown() builds a new Markdown instance and reloads its
+extensions on every call. render() keeps one converter per extension set,
+resetting it between documents, and caches each rendered fragment under the
+SHA-256 of its text: in memory (bounded LRU) and on disk, so a rebuild only
+reconverts fragments whose markdown changed.
+
+The disk cache lives in .cache/md-html/ next to this module, one file per
+fragment; prune() evicts the least recently used files beyond a size budget.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import markdown
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "md-html"
+DEFAULT_EXTENSIONS = ("tables", "fenced_code")
+
+MEMORY_ENTRIES = 256   # fragments kept in memory per process
+DISK_BYTES = 32 << 20  # disk cache budget enforced by prune()
+
+_converters = {}
+_memory = OrderedDict()
+
+
+def converter(extensions=DEFAULT_EXTENSIONS):
+    """The shared Markdown instance for an extension set."""
+    extensions = tuple(extensions)
+    md = _converters.get(extensions)
+    if md is None:
+        md = _converters[extensions] = markdown.Markdown(extensions=list(extensions))
+    return md
+
+
+def fragment_key(text, extensions=DEFAULT_EXTENSIONS):
+    """Cache key: hash of the markdown text, extensions and library version."""
+    h = hashlib.sha256()
+    for part in (markdown.__version__, *extensions, text):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _remember(key, html):
+    _memory[key] = html
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def render(text, extensions=DEFAULT_EXTENSIONS, use_cache=True):
+    """Convert markdown text to HTML, reusing a cached fragment if possible."""
+    extensions = tuple(extensions)
+    if not use_cache:
+        return converter(extensions).reset().convert(text)
+
+    key = fragment_key(text, extensions)
+    html = _memory.get(key)
+    if html is not None:
+        _memory.move_to_end(key)
+        return html
+
+    path = CACHE_DIR / f"{key}.html"
+    try:
+        html = path.read_text()
+        # Touch on read so prune() evicts least recently used fragments
+        os.utime(path)
+    except FileNotFoundError:
+        html = converter(extensions).reset().convert(text)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(html)
+        os.replace(tmp, path)
+    _remember(key, html)
+    return html
+
+
+def prune(max_bytes=DISK_BYTES):
+    """Delete least recently used cached fragments until under max_bytes.
+
+    Returns the number of files removed.
+    """
+    try:
+        entries = [(p.stat(), p) for p in CACHE_DIR.glob("*.html")]
+    except FileNotFoundError:
+        return 0
+    total = sum(st.st_size for st, _ in entries)
+    removed = 0
+    for st, path in sorted(entries, key=lambda e: e[0].st_mtime_ns):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= st.st_size
+        removed += 1
+    return removed
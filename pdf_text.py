@@ -0,0 +1,488 @@
+"""Cached PDF text extraction shared by build-html.py and clean-source-text.py.
+
+Text is extracted by a pluggable backend and stored on disk page by page,
+keyed by the SHA-256 of the PDF plus the extraction options (backend, raw vs.
+layout, page range). Derived results such as the marker-to-page map live in
+the same cache, so a rebuild against an unchanged PDF does no extraction at
+all.
+
+Backends (selected with the ``backend`` argument, see BACKENDS):
+    pdftotext  poppler's pdftotext in a subprocess (reference output)
+    pikepdf    in-process: walks page content streams and decodes text
+               through each font's ToUnicode map; no poppler-utils needed
+
+Large documents can be extracted in page chunks on a process pool
+(extract_parallel / get_pages(workers=N)); output matches a serial run.
+
+Cache layout:
+    .cache/pdf-text/<pdf sha256>/pdftotext-raw-all.json      per-page text
+    .cache/pdf-text/<pdf sha256>/pikepdf-layout-1-40.json    per-page -layout text
+    .cache/pdf-text/<pdf sha256>/markers-<key>.json          marker-to-page map
+"""
+
+import hashlib
+import json
+import os
+import re
+import statistics
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pikepdf
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "pdf-text"
+
+# Digests are memoized per (path, size, mtime) so a run hashes each PDF once
+_digests = {}
+
+
+def pdf_digest(pdf_path):
+    """Return the SHA-256 hex digest of a PDF's contents."""
+    pdf_path = Path(pdf_path)
+    st = pdf_path.stat()
+    memo_key = (str(pdf_path.resolve()), st.st_size, st.st_mtime_ns)
+    if memo_key not in _digests:
+        h = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digests[memo_key] = h.hexdigest()
+    return _digests[memo_key]
+
+
+def _entry_path(pdf_path, name):
+    return CACHE_DIR / pdf_digest(pdf_path) / f"{name}.json"
+
+
+def _read_entry(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(path, data):
+    """Write a cache entry atomically so concurrent builds never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def _range_name(backend, layout, first, last):
+    mode = "layout" if layout else "raw"
+    if first is None and last is None:
+        return f"{backend}-{mode}-all"
+    return f"{backend}-{mode}-{first or 1}-{last or 'end'}"
+
+
+# ---------------------------------------------------------------------------
+# Backends: (pdf_path, layout, first, last) -> list of per-page text
+# ---------------------------------------------------------------------------
+
+
+def run_pdftotext(pdf_path, layout=False, first=None, last=None):
+    """Run pdftotext once and return the text of each page as a list.
+
+    pdftotext terminates each page with a form feed, so splitting on it gives
+    one chunk per page (the trailing form feed leaves an empty chunk, dropped).
+    Raises CalledProcessError if pdftotext fails.
+    """
+    cmd = ["pdftotext"]
+    if layout:
+        cmd.append("-layout")
+    if first is not None:
+        cmd += ["-f", str(first)]
+    if last is not None:
+        cmd += ["-l", str(last)]
+    cmd += [str(pdf_path), "-"]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    pages = result.stdout.split("\f")
+    if pages and not pages[-1]:
+        pages.pop()
+    return pages
+
+
+def _parse_hex(code):
+    """Decode a ToUnicode destination (UTF-16BE hex) into a string."""
+    raw = bytes.fromhex(code)
+    return raw.decode("utf-16-be", errors="replace") if len(raw) % 2 == 0 else raw.decode("latin-1")
+
+
+class _Font:
+    """Just enough of a PDF font to map string bytes to Unicode and widths."""
+
+    def __init__(self, font):
+        self.code_bytes = 2 if font.get("/Subtype") == "/Type0" else 1
+        self.to_unicode = {}
+        self.widths = {}
+        self.default_width = 500
+
+        if "/ToUnicode" in font:
+            self._read_cmap(font.ToUnicode.read_bytes().decode("latin-1"))
+
+        if self.code_bytes == 2:
+            cid_font = font.DescendantFonts[0]
+            self.default_width = float(cid_font.get("/DW", 1000))
+            w = list(cid_font.get("/W", []))
+            i = 0
+            while i + 1 < len(w):
+                if isinstance(w[i + 1], pikepdf.Array):
+                    for k, width in enumerate(w[i + 1]):
+                        self.widths[int(w[i]) + k] = float(width)
+                    i += 2
+                else:
+                    for cid in range(int(w[i]), int(w[i + 1]) + 1):
+                        self.widths[cid] = float(w[i + 2])
+                    i += 3
+        elif "/Widths" in font:
+            first_char = int(font.get("/FirstChar", 0))
+            for k, width in enumerate(font.Widths):
+                self.widths[first_char + k] = float(width)
+
+    def _read_cmap(self, cmap):
+        span = re.search(r"begincodespacerange\s*<([0-9A-Fa-f]+)>", cmap)
+        if span:
+            self.code_bytes = len(span.group(1)) // 2
+        for block in re.findall(r"beginbfchar(.*?)endbfchar", cmap, re.S):
+            for src, dst in re.findall(r"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>", block):
+                self.to_unicode[int(src, 16)] = _parse_hex(dst)
+        for block in re.findall(r"beginbfrange(.*?)endbfrange", cmap, re.S):
+            for lo, hi, dst in re.findall(
+                    r"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])", block):
+                lo, hi = int(lo, 16), int(hi, 16)
+                if dst.startswith("["):
+                    for k, item in enumerate(re.findall(r"<([0-9A-Fa-f]*)>", dst)):
+                        self.to_unicode[lo + k] = _parse_hex(item)
+                else:
+                    base = bytes.fromhex(dst[1:-1])
+                    for k in range(hi - lo + 1):
+                        # Increment the last byte of the destination per code
+                        dest = base[:-1] + bytes([base[-1] + k]) if base else b""
+                        self.to_unicode[lo + k] = _parse_hex(dest.hex())
+
+    def decode(self, data):
+        """Yield (text, width in glyph units, is_space) for each character code."""
+        n = self.code_bytes
+        for i in range(0, len(data) - n + 1, n):
+            code = int.from_bytes(data[i:i + n], "big")
+            text = self.to_unicode.get(code)
+            if text is None:
+                text = chr(code) if n == 1 else ""
+            yield text, self.widths.get(code, self.default_width), n == 1 and code == 32
+
+
+def _mul(m, n):
+    """Multiply two PDF matrices given as 6-tuples."""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (a * a2 + b * c2, a * b2 + b * d2,
+            c * a2 + d * c2, c * b2 + d * d2,
+            e * a2 + f * c2 + e2, e * b2 + f * d2 + f2)
+
+
+def _page_spans(page):
+    """Walk a page's content stream and return positioned text runs.
+
+    Each run is (x, y, font_size, end_x, text) in default user space.
+    """
+    spans = []
+    fonts = {}
+
+    def show(data, state):
+        font = state["font"]
+        if font is None:
+            return
+        trm = _mul((state["size"] * state["hscale"], 0, 0, state["size"], 0, state["rise"]),
+                   _mul(state["tm"], state["ctm"]))
+        x, y = trm[4], trm[5]
+        size = abs(trm[3]) or abs(trm[0])
+        chars = []
+        for text, width, is_space in font.decode(data):
+            chars.append(text)
+            tx = (width / 1000 * state["size"] + state["tc"]
+                  + (state["tw"] if is_space else 0)) * state["hscale"]
+            state["tm"] = _mul((1, 0, 0, 1, tx, 0), state["tm"])
+        end_x = _mul(state["tm"], state["ctm"])[4]
+        spans.append((x, y, size, end_x, "".join(chars)))
+
+    def walk(container, resources, ctm):
+        font_dict = resources.get("/Font", {}) if resources is not None else {}
+        xobjects = resources.get("/XObject", {}) if resources is not None else {}
+        state = {"ctm": ctm, "tm": (1, 0, 0, 1, 0, 0), "tlm": (1, 0, 0, 1, 0, 0),
+                 "font": None, "size": 0, "tc": 0, "tw": 0, "hscale": 1,
+                 "leading": 0, "rise": 0}
+        stack = []
+        for operands, operator in pikepdf.parse_content_stream(container):
+            op = str(operator)
+            if op == "q":
+                stack.append(dict(state))
+            elif op == "Q" and stack:
+                state = stack.pop()
+            elif op == "cm":
+                state["ctm"] = _mul(tuple(float(v) for v in operands), state["ctm"])
+            elif op == "BT":
+                state["tm"] = state["tlm"] = (1, 0, 0, 1, 0, 0)
+            elif op == "Tf":
+                name = str(operands[0])
+                if name not in fonts and name in font_dict:
+                    fonts[name] = _Font(font_dict[name])
+                state["font"] = fonts.get(name)
+                state["size"] = float(operands[1])
+            elif op == "Tc":
+                state["tc"] = float(operands[0])
+            elif op == "Tw":
+                state["tw"] = float(operands[0])
+            elif op == "Tz":
+                state["hscale"] = float(operands[0]) / 100
+            elif op == "TL":
+                state["leading"] = float(operands[0])
+            elif op == "Ts":
+                state["rise"] = float(operands[0])
+            elif op == "Tm":
+                state["tm"] = state["tlm"] = tuple(float(v) for v in operands)
+            elif op in ("Td", "TD"):
+                tx, ty = float(operands[0]), float(operands[1])
+                if op == "TD":
+                    state["leading"] = -ty
+                state["tm"] = state["tlm"] = _mul((1, 0, 0, 1, tx, ty), state["tlm"])
+            elif op == "T*":
+                state["tm"] = state["tlm"] = _mul((1, 0, 0, 1, 0, -state["leading"]), state["tlm"])
+            elif op == "Tj":
+                show(bytes(operands[0]), state)
+            elif op in ("'", '"'):
+                if op == '"':
+                    state["tw"], state["tc"] = float(operands[0]), float(operands[1])
+                state["tm"] = state["tlm"] = _mul((1, 0, 0, 1, 0, -state["leading"]), state["tlm"])
+                show(bytes(operands[-1]), state)
+            elif op == "TJ":
+                for item in operands[0]:
+                    if isinstance(item, pikepdf.String):
+                        show(bytes(item), state)
+                    else:
+                        tx = -float(item) / 1000 * state["size"] * state["hscale"]
+                        state["tm"] = _mul((1, 0, 0, 1, tx, 0), state["tm"])
+            elif op == "Do":
+                xobj = xobjects.get(str(operands[0]))
+                if xobj is not None and xobj.get("/Subtype") == "/Form":
+                    matrix = tuple(float(v) for v in xobj.get("/Matrix", [1, 0, 0, 1, 0, 0]))
+                    walk(xobj, xobj.get("/Resources", resources), _mul(matrix, state["ctm"]))
+
+    walk(page.obj, page.obj.get("/Resources"), (1, 0, 0, 1, 0, 0))
+    return spans
+
+
+def _group_lines(spans):
+    """Cluster runs into lines (top to bottom), each sorted left to right."""
+    lines = []
+    for span in sorted(spans, key=lambda s: (-s[1], s[0])):
+        if lines and abs(lines[-1][0] - span[1]) < 0.5 * max(span[2], 1):
+            lines[-1][1].append(span)
+        else:
+            lines.append((span[1], [span]))
+    return [(y, sorted(runs)) for y, runs in lines]
+
+
+def _render_page(spans, layout):
+    """Turn positioned runs into text, approximating pdftotext's two modes."""
+    spans = [s for s in spans if s[4].strip()]
+    if not spans:
+        return ""
+    lines = _group_lines(spans)
+
+    if not layout:
+        out = []
+        for _, runs in lines:
+            parts = []
+            prev_end = None
+            for x, _, size, end_x, text in runs:
+                if prev_end is not None and x - prev_end > 0.1 * size:
+                    parts.append(" ")
+                parts.append(text.strip())
+                prev_end = end_x
+            out.append("".join(parts))
+        return "\n".join(out) + "\n"
+
+    # Layout mode: map x positions onto a fixed character grid, and vertical
+    # gaps larger than the usual line spacing onto blank lines
+    # Runs that do not advance in +x (rotated or zero-width text) say nothing
+    # about the grid; a page with only such runs gets a unit grid
+    widths = [(s[3] - s[0]) / len(s[4]) for s in spans if s[3] > s[0] and s[4]]
+    char_width = statistics.median(widths) if widths else 1
+    left = min(s[0] for s in spans)
+    gaps = [a[0] - b[0] for a, b in zip(lines, lines[1:])]
+    pitch = statistics.median(gaps) if gaps else 1
+    out = []
+    prev_y = None
+    for y, runs in lines:
+        if prev_y is not None:
+            out.extend([""] * max(round((prev_y - y) / pitch) - 1, 0))
+        row = ""
+        prev_end = None
+        for x, _, _, end_x, text in runs:
+            if prev_end is not None and x - prev_end < 2 * char_width:
+                # Ordinary word gap: a single space, as pdftotext emits
+                row += " " + text.strip()
+            else:
+                col = max(round((x - left) / char_width), len(row) + 1 if row else 0)
+                row = row.ljust(col) + text.strip()
+            prev_end = end_x
+        out.append(row)
+        prev_y = y
+    return "\n".join(out) + "\n"
+
+
+def iter_pikepdf(pdf_path, layout=False, first=None, last=None):
+    """Yield per-page text in process by interpreting content streams."""
+    with pikepdf.open(pdf_path) as pdf:
+        start = (first or 1) - 1
+        stop = last or len(pdf.pages)
+        for i in range(start, stop):
+            yield _render_page(_page_spans(pdf.pages[i]), layout)
+
+
+def run_pikepdf(pdf_path, layout=False, first=None, last=None):
+    """Extract per-page text in process by interpreting content streams."""
+    return list(iter_pikepdf(pdf_path, layout=layout, first=first, last=last))
+
+
+def iter_pdftotext(pdf_path, layout=False, first=None, last=None):
+    """Yield per-page text as pdftotext writes it, reading from a pipe."""
+    cmd = ["pdftotext"] + (["-layout"] if layout else [])
+    if first is not None:
+        cmd += ["-f", str(first)]
+    if last is not None:
+        cmd += ["-l", str(last)]
+    cmd += [str(pdf_path), "-"]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+        buffered = ""
+        for chunk in iter(lambda: proc.stdout.read(1 << 16), ""):
+            *pages, buffered = (buffered + chunk).split("\f")
+            yield from pages
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    if buffered:
+        yield buffered
+
+
+BACKENDS = {
+    "pdftotext": run_pdftotext,
+    "pikepdf": run_pikepdf,
+}
+DEFAULT_BACKEND = "pdftotext"
+
+# Streaming counterparts: yield one page at a time without holding the document
+STREAMING_BACKENDS = {
+    "pdftotext": iter_pdftotext,
+    "pikepdf": iter_pikepdf,
+}
+
+
+def iter_lines(pdf_path, layout=False, backend=DEFAULT_BACKEND):
+    """Yield the lines of join_pages(pages) as pages stream in.
+
+    Equivalent to ``join_pages(get_pages(...)).split("\\n")`` but holds at
+    most one page in memory. Bypasses the cache.
+    """
+    carry = ""
+    for page in STREAMING_BACKENDS[backend](pdf_path, layout=layout):
+        *lines, carry = (carry + page + "\f").split("\n")
+        yield from lines
+    yield carry
+
+# Pages per chunk when extracting in parallel
+CHUNK_PAGES = 64
+
+
+def _extract_chunk(job):
+    backend, pdf_path, layout, first, last = job
+    return BACKENDS[backend](pdf_path, layout=layout, first=first, last=last)
+
+
+def extract_parallel(pdf_path, layout=False, first=None, last=None,
+                     backend=DEFAULT_BACKEND, workers=1, chunk_pages=CHUNK_PAGES):
+    """Extract a page range in chunks on a bounded process pool.
+
+    Each chunk is an independent extraction of pages [first, last]; results
+    are reassembled in page order, so the output matches a serial run.
+    """
+    first = first or 1
+    if last is None:
+        with pikepdf.open(pdf_path) as pdf:
+            last = len(pdf.pages)
+    jobs = [(backend, str(pdf_path), layout, lo, min(lo + chunk_pages - 1, last))
+            for lo in range(first, last + 1, chunk_pages)]
+    if workers <= 1 or len(jobs) <= 1:
+        return [page for job in jobs for page in _extract_chunk(job)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        # map() yields results in submission order, i.e. page order
+        return [page for chunk in pool.map(_extract_chunk, jobs) for page in chunk]
+
+
+# ---------------------------------------------------------------------------
+# Cached access
+# ---------------------------------------------------------------------------
+
+def get_pages(pdf_path, layout=False, first=None, last=None, use_cache=True,
+              backend=DEFAULT_BACKEND, workers=1):
+    """Return per-page text for a PDF, extracting only on a cache miss.
+
+    With workers > 1 the extraction is split into page chunks and run in
+    parallel; the result (and its cache entry) is the same as a serial run.
+    """
+    path = _entry_path(pdf_path, _range_name(backend, layout, first, last))
+    if use_cache:
+        pages = _read_entry(path)
+        if pages is not None:
+            return pages
+    if workers > 1:
+        pages = extract_parallel(pdf_path, layout=layout, first=first, last=last,
+                                 backend=backend, workers=workers)
+    else:
+        pages = BACKENDS[backend](pdf_path, layout=layout, first=first, last=last)
+    # An empty result means pdftotext failed; don't persist it
+    if use_cache and pages:
+        _write_entry(path, pages)
+    return pages
+
+
+def join_pages(pages):
+    """Reassemble per-page text into pdftotext's original stdout form."""
+    return "".join(page + "\f" for page in pages)
+
+
+def config_key(obj):
+    """Short stable hash of a JSON-serializable config (e.g. section markers)."""
+    blob = json.dumps(obj, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def load_markers(pdf_path, key):
+    """Return a cached (marker_pages, total_pages) pair, or None on a miss."""
+    data = _read_entry(_entry_path(pdf_path, f"markers-{key}"))
+    if data is None:
+        return None
+    # JSON object keys are strings, so markers are stored as [key, page] pairs
+    return {k: page for k, page in data["markers"]}, data["total"]
+
+
+def save_markers(pdf_path, key, marker_pages, total_pages):
+    """Store the marker-to-page map computed for a PDF and marker config."""
+    _write_entry(_entry_path(pdf_path, f"markers-{key}"), {
+        "markers": [[k, page] for k, page in marker_pages.items()],
+        "total": total_pages,
+    })
+
+
+def cached(pdf_path, name, compute):
+    """Return the cache entry `name` for a PDF, computing and storing it on a miss.
+
+    compute() must return JSON-serializable data derived only from the PDF.
+    """
+    path = _entry_path(pdf_path, name)
+    data = _read_entry(path)
+    if data is None:
+        data = compute()
+        _write_entry(path, data)
+    return data
@@ -0,0 +1,119 @@
+"""Local preview server with live reload, for build-html.py --watch.
+
+serve() starts a threaded HTTP server for a directory in the background.
+HTML pages are served with a small script injected before </body> that
+listens for server-sent events on RELOAD_PATH; LiveReload.notify() makes
+every open page reload. Nothing is injected into the files on disk.
+
+The build ids sent to pages include the server's pid, so a page that
+reconnects to a restarted server (after a script change) reloads too.
+"""
+
+import http.server
+import os
+import threading
+from functools import partial
+from pathlib import Path
+
+RELOAD_PATH = "/__livereload"
+KEEPALIVE_SECONDS = 15
+
+RELOAD_SCRIPT = f"""
+  <script>
+    (function () {{
+      var build = null;
+      new EventSource("{RELOAD_PATH}").onmessage = function (event) {{
+        if (build !== null && event.data !== build) location.reload();
+        build = event.data;
+      }};
+    }})();
+  </script>
+"""
+
+
+class LiveReload:
+    """The current build id, and a way to wait for the next one."""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._count = 0
+
+    @property
+    def build_id(self):
+        return f"{os.getpid()}-{self._count}"
+
+    def notify(self):
+        """Tell every connected page that a new build is ready."""
+        with self._changed:
+            self._count += 1
+            self._changed.notify_all()
+
+    def wait(self, seen, timeout):
+        """Block until the build id differs from seen (or timeout); return it."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.build_id != seen, timeout)
+            return self.build_id
+
+
+class PreviewHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files, never cached, with the reload script in HTML pages."""
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self.send_events()
+        path = Path(self.translate_path(self.path))
+        if path.suffix == ".html" and path.is_file():
+            return self.send_page(path)
+        return super().do_GET()
+
+    def send_page(self, path):
+        body = path.read_bytes()
+        end = body.rfind(b"</body>")
+        if end != -1:
+            body = body[:end] + RELOAD_SCRIPT.encode() + body[end:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        seen = None
+        try:
+            # Reconnect quickly when the server restarts
+            self.wfile.write(b"retry: 500\n\n")
+            while True:
+                build = self.server.live_reload.wait(seen, KEEPALIVE_SECONDS)
+                if build == seen:
+                    # Comment line: finds closed tabs so their thread can exit
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    self.wfile.write(f"data: {build}\n\n".encode())
+                    seen = build
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def end_headers(self):
+        # Rebuilt PDFs and pages keep their names: always refetch
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass  # the build output is what matters in the terminal
+
+
+def serve(directory, port=8000, host="127.0.0.1"):
+    """Serve directory on host:port from a background thread.
+
+    Returns the server; its live_reload attribute is the LiveReload to
+    notify after each build. Stop it with shutdown() and server_close().
+    """
+    handler = partial(PreviewHandler, directory=str(directory))
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.live_reload = LiveReload()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,176 @@
+"""Single-pass multi-marker search for section boundary detection.
+
+An Aho-Corasick automaton over every marker string finds all of them in one
+linear pass over the text, instead of one substring search per marker per
+page. Scanning stops as soon as every marker has been located, so the cost
+depends on where the last boundary is rather than on the document length.
+
+FuzzyMarkerIndex is the fallback for markers that do not appear verbatim
+(OCR glitches, ligatures, different typesetting): a character n-gram index
+over every line, queried for the line most similar to a marker.
+"""
+
+import re
+import unicodedata
+from collections import Counter, defaultdict, deque
+from typing import NamedTuple
+
+# Lowest n-gram similarity accepted for a marker with no exact match;
+# unrelated lines of body text typically score below 0.3
+MIN_MARKER_CONFIDENCE = 0.6
+
+# Part of the cache key for found marker pages: bump it whenever matching
+# changes, so maps cached by an older matcher are not served
+MATCHER_VERSION = 2
+
+
+class MarkerScanner:
+    """Aho-Corasick matcher over a set of keyed markers.
+
+    markers: iterable of (key, text, whole_line). A whole_line marker only
+    counts when it starts a line and is followed by nothing but whitespace,
+    like the regex ``^TEXT\\s*$`` with re.MULTILINE.
+    """
+
+    def __init__(self, markers):
+        self.markers = list(markers)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for index, (_, text, _) in enumerate(self.markers):
+            state = 0
+            for ch in text:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        # Breadth-first pass to fill in failure links and merged outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state:
+                    fail = self._fail[state]
+                    while fail and ch not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """Yield (key, start, end) for every marker occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                key, marker, whole_line = self.markers[index]
+                start = pos + 1 - len(marker)
+                if whole_line and not _alone_on_line(text, start, pos + 1):
+                    continue
+                yield key, start, pos + 1
+
+    def first_matches(self, chunks):
+        """Map each key to the index of the first chunk that contains it.
+
+        Chunks (e.g. pages or lines) are scanned in order, and scanning stops
+        once every key has been found.
+        """
+        wanted = {key for key, _, _ in self.markers}
+        found = {}
+        for index, text in enumerate(chunks):
+            for key, _, _ in self.iter_matches(text):
+                if key not in found:
+                    found[key] = index
+                    if len(found) == len(wanted):
+                        return found
+        return found
+
+
+def _alone_on_line(text, start, end):
+    if start and text[start - 1] != "\n":
+        return False
+    line_end = text.find("\n", end)
+    if line_end == -1:
+        line_end = len(text)
+    return not text[end:line_end].strip()
+
+
+class FuzzyMatch(NamedTuple):
+    chunk: int         # index of the chunk (page or line) holding the match
+    line: int          # line number within that chunk
+    text: str          # the matched line as it appears in the chunk
+    confidence: float  # n-gram similarity to the marker, 0-1
+
+
+def normalize(text):
+    """Fold case, ligatures and punctuation so near-identical text compares equal."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+def ngrams(text, n=3):
+    """Set of character n-grams of normalized text, padded at word edges."""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class FuzzyMarkerIndex:
+    """Character n-gram index over the lines of a sequence of chunks.
+
+    Building the index is one pass over the text. A query only visits the
+    lines that share an n-gram with the marker, through the posting lists,
+    and scores them with the Dice coefficient of the two n-gram sets, so
+    matching a marker costs time proportional to those posting lists
+    rather than an edit-distance comparison against every line.
+
+    Lines longer than max_line normalized characters are not indexed: a
+    heading is never a full line of body text.
+    """
+
+    def __init__(self, chunks, n=3, max_line=120):
+        self.n = n
+        self._lines = []   # (chunk index, line number, original text)
+        self._sizes = []   # n-gram set size per indexed line
+        self._postings = defaultdict(list)
+        for chunk_index, chunk in enumerate(chunks):
+            for line_number, line in enumerate(chunk.split("\n")):
+                if not line:
+                    continue
+                norm = normalize(line)
+                if not norm or len(norm) > max_line:
+                    continue
+                grams = ngrams(norm, n)
+                line_id = len(self._lines)
+                self._lines.append((chunk_index, line_number, line.strip()))
+                self._sizes.append(len(grams))
+                for gram in grams:
+                    self._postings[gram].append(line_id)
+
+    def best_match(self, marker):
+        """The indexed line most similar to marker, or None if nothing shares
+        an n-gram with it. Ties go to the earliest line.
+        """
+        grams = ngrams(normalize(marker), self.n)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        best = None
+        for line_id, count in shared.items():
+            score = 2 * count / (len(grams) + self._sizes[line_id])
+            if best is None or score > best[0] or (score == best[0] and line_id < best[1]):
+                best = (score, line_id)
+        if best is None:
+            return None
+        score, line_id = best
+        chunk_index, line_number, text = self._lines[line_id]
+        return FuzzyMatch(chunk_index, line_number, text, round(score, 3))
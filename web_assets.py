@@ -0,0 +1,250 @@
+"""Production web output: minified HTML/CSS, fingerprinted stylesheets and
+precompressed siblings.
+
+minify_css() and minify_html() are deliberately conservative: they drop
+comments and collapse whitespace, but never remove whitespace that could
+separate inline content, and leave <pre>, <textarea>, <script> and <style>
+bodies alone (style bodies are minified separately with minify_css()).
+
+publish() copies a built site into the deployed directory with every asset
+renamed by content hash (section-3.pdf -> section-3.a1b2c3d4e5f6.pdf), so
+assets can be cached forever; only the HTML pages keep stable names.
+
+precompress() writes FILE.gz and FILE.br next to each artifact so a static
+server (nginx gzip_static/brotli_static, most CDNs) can send them as is
+instead of compressing on every request. Brotli needs the optional brotli
+package; without it only .gz files are written. Builds that do not
+precompress call remove_stale_compressed() instead, so a server never sends
+an older build's .gz/.br in place of a rewritten file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+import build_graph
+
+COMPRESSIBLE = (".html", ".css", ".pdf")
+ASSET_MANIFEST = "asset-manifest.json"
+
+# name.<12 hex digits>.ext, and its precompressed copies
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+(\.gz|\.br)?$")
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,])\s*")
+_CSS_COLON_RE = re.compile(r":\s+")
+
+_CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+_RAW_BLOCK_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.S | re.I)
+_HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_NEWLINE_SPACE_RE = re.compile(r"[ \t\r\f]*\n\s*")
+_SPACE_RE = re.compile(r"[ \t\r\f]+")
+
+
+def minify_css(css):
+    """Strip comments and unneeded whitespace from a stylesheet."""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    # Only after a colon: a space before one can be a descendant selector
+    css = _CSS_COLON_RE.sub(":", css)
+    return css.replace(";}", "}").strip()
+
+
+def split_css(css, selectors):
+    """Split flat CSS rules into (matching, other) stylesheets.
+
+    A rule matches when every selector in its list starts with one of
+    `selectors` ("nav a:hover" starts with "nav"), so the matching part can
+    be inlined as critical CSS while the rest is loaded from a file.
+    """
+    matching, other = [], []
+    for m in _CSS_RULE_RE.finditer(css):
+        rule = m.group(0).strip()
+        heads = [s.split()[0].split(":")[0] for s in m.group(1).split(",") if s.strip()]
+        (matching if heads and all(h in selectors for h in heads) else other).append(rule)
+    return "\n".join(matching), "\n".join(other)
+
+
+def _minify_text(html):
+    html = _HTML_COMMENT_RE.sub("", html)
+    # A whitespace run is significant between inline elements, so it is
+    # shortened rather than removed: to a newline if it had one, else a space
+    html = _NEWLINE_SPACE_RE.sub("\n", html)
+    return _SPACE_RE.sub(" ", html)
+
+
+def minify_html(html):
+    """Collapse whitespace and drop comments outside raw-text elements."""
+    parts = _RAW_BLOCK_RE.split(html)
+    out = []
+    # split() yields text, whole block, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        out.append(_minify_text(parts[i]))
+        if i + 1 < len(parts):
+            block = parts[i + 1]
+            if parts[i + 2].lower() == "style":
+                open_end = block.index(">") + 1
+                close_start = block.rindex("<")
+                block = block[:open_end] + minify_css(block[open_end:close_start]) + block[close_start:]
+            out.append(block)
+    return "".join(out)
+
+
+def fingerprinted_name(stem, suffix, content):
+    """stem.<first 12 hex digits of the SHA-256 of content>suffix."""
+    data = content.encode() if isinstance(content, str) else content
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}"
+
+
+def _write_if_changed(path, data):
+    """Write data to path unless it already holds exactly that."""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(path, data)
+    return True
+
+
+def publish(site, output, pages, assets, keep=()):
+    """Copy a built site into output with content-hashed asset names.
+
+    pages: paths (relative to site, at its top level) of the HTML pages.
+    They keep their names, and their references to other assets are
+    rewritten. assets: paths of the files the pages use. Assets whose names
+    already carry a content hash, or that lie under one of the `keep`
+    directories (named by content some other way), keep their names; every
+    other asset becomes name.<hash>.ext.
+
+    Writes output/asset-manifest.json, mapping each built path to its
+    published one, and deletes files in output that are no longer published,
+    together with their .gz/.br copies: hashed names (or files under `keep`)
+    from earlier builds, and unhashed copies of assets that now have a
+    hashed name (left by a build without hashing).
+    Returns (manifest, removed paths).
+    """
+    site, output = Path(site), Path(output)
+    keep = tuple(keep)
+    built, assets = assets, {}
+    for rel in sorted(built):
+        path = site / rel
+        if HASHED_NAME_RE.search(path.name) or rel.startswith(keep):
+            published = rel
+        else:
+            digest = build_graph.sha256_file(path)[:12]
+            published = Path(rel).with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+        assets[rel] = published
+        target = output / published
+        if not target.exists():
+            # Copied, not hard-linked: the build rewrites its files in place
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+
+    renames = {rel: published for rel, published in assets.items() if rel != published}
+    reference_re = re.compile("|".join(re.escape(rel) for rel in
+                                       sorted(renames, key=len, reverse=True)))
+    for rel in pages:
+        html = (site / rel).read_text()
+        if renames:
+            html = reference_re.sub(lambda m: renames[m.group(0)], html)
+        _write_if_changed(output / rel, html.encode())
+        assets[rel] = rel
+
+    manifest = dict(sorted(assets.items()))
+    _write_if_changed(output / ASSET_MANIFEST,
+                      (json.dumps(manifest, indent=1) + "\n").encode())
+
+    live = set(manifest.values())
+    replaced = set(renames)
+    removed = []
+    for path in sorted(output.rglob("*")):
+        rel = path.relative_to(output).as_posix()
+        base = rel[:-3] if rel.endswith((".gz", ".br")) else rel
+        if (path.is_file() and base not in live
+                and (HASHED_NAME_RE.search(path.name) or rel.startswith(keep)
+                     or base in replaced)):
+            path.unlink()
+            removed.append(rel)
+    return manifest, removed
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def precompress_file(path):
+    """Write path.gz (and path.br if brotli is available) unless up to date.
+
+    Returns (size, {".gz": compressed size, ...}) for the encodings written.
+    """
+    path = Path(path)
+    data = None
+    sizes = {}
+    encoders = {".gz": lambda d: gzip.compress(d, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        encoders[".br"] = lambda d: brotli.compress(d, quality=11)
+    mtime = path.stat().st_mtime_ns
+    for ext, encode in encoders.items():
+        target = path.with_name(path.name + ext)
+        if target.exists() and target.stat().st_mtime_ns >= mtime:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        encoded = encode(data)
+        _write_atomic(target, encoded)
+        sizes[ext] = len(encoded)
+    return path.stat().st_size, sizes
+
+
+def precompress(root, jobs=1):
+    """Precompress every HTML, CSS and PDF file under root.
+
+    Returns {path: (size, compressed sizes)} for the files that were
+    (re)compressed.
+    """
+    paths = sorted(p for p in Path(root).rglob("*")
+                   if p.suffix in COMPRESSIBLE and p.is_file())
+    results = build_graph.parallel_map(precompress_file, paths, jobs)
+    return {path: result for path, result in zip(paths, results) if result[1]}
+
+
+def remove_stale_compressed(root):
+    """Delete .gz/.br copies of HTML, CSS and PDF files under root that are
+    older than the file they compress, or whose file no longer exists.
+
+    Returns the removed paths.
+    """
+    removed = []
+    for path in sorted(Path(root).rglob("*")):
+        source = path.with_name(path.stem)
+        if (path.suffix not in (".gz", ".br") or source.suffix not in COMPRESSIBLE
+                or not path.is_file()):
+            continue
+        if not source.is_file() or source.stat().st_mtime_ns > path.stat().st_mtime_ns:
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def have_brotli():
+    return _brotli() is not None